@@ -0,0 +1,236 @@
+"""
+Measures how DexI commands scale, against a local stand-in GitHub server.
+
+Creates a Ballsdex project with synthetic packages and runs `add`, `install`,
+`install --all`, `update`, `list` and `remove` in fresh interpreters, recording the
+wall time, peak RSS, request count, bytes downloaded and bytes written to the project.
+
+Usage: python benchmarks/commands.py [--packages 20] [--files 10] [--file-size 4096]
+                                     [--assets 0] [--apps] [--partial] [--jobs 4]
+                                     [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from github import FakeGitHub, Repository
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENTRYPOINT = "from dexi.app import app; app(prog_name='dexi')"
+
+
+@dataclass
+class Measurement:
+    command: str
+    wall_s: float
+    peak_rss_kb: int
+    requests: int
+    bytes_downloaded: int
+    bytes_written: int
+    exit_code: int
+
+
+def create_project(path: Path):
+    """
+    Creates an empty Ballsdex project.
+    """
+    (path / "ballsdex").mkdir(parents=True)
+    (path / "admin_panel").mkdir()
+    (path / "ballsdex" / "__init__.py").write_text('__version__ = "2.29.5"\n')
+    (path / "pyproject.toml").write_text(
+        '[project]\nname = "ballsdex"\nversion = "2.29.5"\n'
+    )
+    (path / "config.yml").write_text(
+        "packages:\n  - ballsdex.packages.admin\n\n"
+        "extra-tortoise-models:\n\nextra-django-apps:\n"
+    )
+
+
+def bytes_written_since(path: Path, since_ns: int) -> int:
+    """
+    Returns the size of every file in a folder modified after a timestamp.
+    """
+    total = 0
+
+    for directory, _, files in os.walk(path):
+        for file in files:
+            stat = os.stat(os.path.join(directory, file))
+
+            if stat.st_mtime_ns >= since_ns:
+                total += stat.st_size
+
+    return total
+
+
+def run(
+    github: FakeGitHub, project: Path, env: dict[str, str], label: str, *args: str
+) -> Measurement:
+    """
+    Runs a DexI command in a fresh interpreter and measures it.
+    """
+    github.reset_stats()
+
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+
+    process = subprocess.Popen(
+        [sys.executable, "-c", ENTRYPOINT, *args],
+        cwd=project,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+
+    exit_code = os.waitstatus_to_exitcode(status)
+
+    if exit_code != 0 and process.stderr is not None:
+        print(process.stderr.read().decode(), file=sys.stderr)
+
+    return Measurement(
+        label,
+        wall,
+        usage.ru_maxrss,
+        github.requests,
+        github.bytes_sent,
+        bytes_written_since(project, start_ns),
+        exit_code,
+    )
+
+
+def benchmark(arguments: argparse.Namespace) -> list[Measurement]:
+    repositories = [
+        Repository(
+            "Author",
+            f"package-{i}",
+            files=arguments.files,
+            file_size=arguments.file_size,
+            assets=arguments.assets,
+            app=arguments.apps,
+        )
+        for i in range(arguments.packages)
+    ]
+
+    measurements = []
+
+    with tempfile.TemporaryDirectory() as directory, FakeGitHub() as github:
+        project = Path(directory) / "project"
+        create_project(project)
+
+        for repository in repositories:
+            github.add(repository)
+
+        env = {
+            **os.environ,
+            **github.environment,
+            "PYTHONPATH": str(ROOT),
+            "DEXI_CACHE_DIR": str(Path(directory) / "cache"),
+            "DEXI_METADATA_TTL": "0",
+            "DEXI_PARTIAL_ARCHIVES": "1" if arguments.partial else "0",
+        }
+
+        jobs = ["--jobs", str(arguments.jobs)]
+
+        added = [
+            run(github, project, env, "add", "add", f"Author/{repository.name}")
+            for repository in repositories
+        ]
+
+        measurements.append(
+            Measurement(
+                f"add x{len(added)}",
+                sum(item.wall_s for item in added),
+                max(item.peak_rss_kb for item in added),
+                sum(item.requests for item in added),
+                sum(item.bytes_downloaded for item in added),
+                sum(item.bytes_written for item in added),
+                max(item.exit_code for item in added),
+            )
+        )
+
+        measurements.append(run(github, project, env, "install", "install", *jobs))
+        measurements.append(
+            run(github, project, env, "install --all", "install", "--all", *jobs)
+        )
+
+        for repository in repositories:
+            repository.bump("1.1.0")
+
+        measurements.append(run(github, project, env, "update", "update", *jobs))
+        measurements.append(run(github, project, env, "list", "list", *jobs))
+        measurements.append(
+            run(github, project, env, "remove", "remove", repositories[0].name)
+        )
+
+    return measurements
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--packages", type=int, default=20)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--file-size", type=int, default=4096)
+    parser.add_argument("--assets", type=int, default=0)
+    parser.add_argument("--apps", action="store_true")
+    parser.add_argument("--partial", action="store_true")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    arguments = parser.parse_args()
+
+    measurements = benchmark(arguments)
+
+    previous = {}
+
+    if arguments.compare is not None:
+        previous = {
+            item["command"]: item
+            for item in json.loads(arguments.compare.read_text())["measurements"]
+        }
+
+    print(
+        f"{'command':<14} {'wall':>9} {'peak rss':>10} {'requests':>9} "
+        f"{'downloaded':>11} {'written':>11}"
+    )
+
+    for item in measurements:
+        line = (
+            f"{item.command:<14} {item.wall_s:8.2f}s {item.peak_rss_kb / 1024:8.1f}MB "
+            f"{item.requests:>9} {item.bytes_downloaded:>11} {item.bytes_written:>11}"
+        )
+
+        if item.command in previous:
+            change = item.wall_s / previous[item.command]["wall_s"] - 1
+            line += f"  ({change:+.0%} wall)"
+
+        if item.exit_code != 0:
+            line += f"  [exit {item.exit_code}]"
+
+        print(line)
+
+    if arguments.output is not None:
+        arguments.output.write_text(
+            json.dumps(
+                {
+                    "parameters": vars(arguments) | {"output": None, "compare": None},
+                    "measurements": [vars(item) for item in measurements],
+                },
+                indent=2,
+            )
+        )
+
+    return 1 if any(item.exit_code != 0 for item in measurements) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+A local stand-in for the GitHub endpoints DexI uses, for benchmarks.
+
+Serves `{RAW_URL}/<author>/<repo>/<branch>/pyproject.toml`,
+`{GITHUB_URL}/<author>/<repo>/archive/refs/heads/<branch>.zip`,
+`{GITHUB_URL}/<author>/<repo>/archive/<commit>.zip` and
+`{GITHUB_URL}/<author>/<repo>.git/info/refs` for synthetic repositories.
+"""
+
+import hashlib
+import io
+import threading
+import zipfile
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ZIP_DATE = (2020, 1, 1, 0, 0, 0)
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Returns the inclusive byte range of a single-range `Range` header, if valid.
+    """
+    if header is None or not header.startswith("bytes=") or "," in header:
+        return None
+
+    first, _, last = header[6:].partition("-")
+
+    try:
+        if not first:
+            return max(0, size - int(last)), size - 1
+
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+
+    return (start, end) if start <= end else None
+
+
+@dataclass
+class Repository:
+    """
+    A synthetic DexI package repository.
+    """
+
+    author: str
+    name: str
+    branch: str = "main"
+    version: str = "1.0.0"
+    files: int = 10
+    file_size: int = 4096
+    assets: int = 0
+    app: bool = False
+    revision: int = 0
+
+    _archive: bytes | None = field(default=None, repr=False)
+
+    @property
+    def target(self) -> str:
+        return self.name.lower().replace("-", "_")
+
+    def pyproject(self) -> bytes:
+        text = (
+            f'[project]\nname = "{self.name}"\nversion = "{self.version}"\n\n'
+            "[tool.dexi]\npublic = true\n\n"
+            f'[tool.dexi.package]\nsource = "{self.name}"\n'
+            f'target = "{self.target}"\nexclude = ["README.md"]\n'
+        )
+
+        if self.app:
+            text += (
+                f'\n[tool.dexi.app]\nsource = "{self.name}_app"\n'
+                f'target = "{self.target}_app"\n'
+            )
+
+        return text.encode()
+
+    def contents(self) -> dict[str, bytes]:
+        files = {"LICENSE": b"MIT License\n", "pyproject.toml": self.pyproject()}
+
+        for i in range(self.files):
+            # Only the first file changes between revisions.
+            revision = self.revision if i == 0 else 0
+            line = f"value_{i} = {revision}  # {'x' * 40}\n".encode()
+
+            files[f"{self.name}/module_{i}.py"] = (line * (self.file_size // len(line)))[
+                : self.file_size
+            ]
+
+        for i in range(self.assets):
+            files[f"assets/asset_{i}.bin"] = bytes(range(256)) * (self.file_size // 256)
+
+        if self.app:
+            files[f"{self.name}_app/__init__.py"] = b""
+            files[f"{self.name}_app/models.py"] = b"# models\n"
+
+        return files
+
+    def archive(self) -> bytes:
+        if self._archive is not None:
+            return self._archive
+
+        buffer = io.BytesIO()
+        base = f"{self.name}-{self.branch}/"
+
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            directories = {base}
+
+            for path, data in sorted(self.contents().items()):
+                parts = path.split("/")[:-1]
+                directories.update(
+                    f"{base}{'/'.join(parts[: i + 1])}/" for i in range(len(parts))
+                )
+
+                info = zipfile.ZipInfo(base + path, ZIP_DATE)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, data)
+
+            for directory in sorted(directories):
+                archive.writestr(zipfile.ZipInfo(directory, ZIP_DATE), b"")
+
+        self._archive = buffer.getvalue()
+
+        return self._archive
+
+    def commit(self) -> bytes:
+        return hashlib.sha1(self.archive()).hexdigest().encode()
+
+    def bump(self, version: str):
+        """
+        Publishes a new version that changes a single file.
+        """
+        self.version = version
+        self.revision += 1
+        self._archive = None
+
+
+class FakeGitHub:
+    """
+    Runs the stand-in server on a background thread.
+    """
+
+    def __init__(self):
+        self.repositories: dict[tuple[str, str, str], Repository] = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.failures: list[tuple[int, dict[str, str]]] = []
+        self.lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def environment(self) -> dict[str, str]:
+        return {"DEXI_GITHUB_URL": f"{self.url}/gh", "DEXI_RAW_URL": f"{self.url}/raw"}
+
+    def add(self, repository: Repository):
+        key = (repository.author, repository.name, repository.branch)
+        self.repositories[key] = repository
+
+    def fail(self, count: int, status: int = 503, headers: dict[str, str] | None = None):
+        """
+        Answers the next `count` requests with an error, such as a rate limit.
+        """
+        with self.lock:
+            self.failures.extend([(status, headers or {})] * count)
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def __enter__(self) -> "FakeGitHub":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def ref_advertisement(self, author: str, name: str) -> tuple[bytes, str] | None:
+        """
+        Lists the branches of a repository like git's smart HTTP protocol does.
+        """
+        lines = [b"# service=git-upload-pack\n", None]
+
+        for repository in self.repositories.values():
+            if (repository.author, repository.name) == (author, name):
+                ref = f"refs/heads/{repository.branch}"
+                lines.append(repository.commit() + f" {ref}\n".encode())
+
+        if len(lines) == 2:
+            return None
+
+        body = b"".join(
+            b"%04x%s" % (len(line) + 4, line) if line is not None else b"0000"
+            for line in lines
+        )
+
+        return body + b"0000", "application/x-git-upload-pack-advertisement"
+
+    def resolve(self, path: str) -> tuple[bytes, str] | None:
+        parts = path.split("?", 1)[0].strip("/").split("/")
+
+        match parts:
+            case ["raw", author, name, branch, "pyproject.toml"]:
+                repository = self.repositories.get((author, name, branch))
+                return (repository.pyproject(), "text/plain") if repository else None
+            case ["gh", author, repository_name, "info", "refs"]:
+                return self.ref_advertisement(
+                    author, repository_name.removesuffix(".git")
+                )
+            case ["gh", author, name, "archive", "refs", "heads", archive]:
+                repository = self.repositories.get((author, name, archive[:-4]))
+                return (repository.archive(), "application/zip") if repository else None
+            case ["gh", author, name, "archive", archive]:
+                for repository in self.repositories.values():
+                    if (repository.author, repository.name) == (author, name) and (
+                        repository.commit().decode() == archive[:-4]
+                    ):
+                        return repository.archive(), "application/zip"
+
+        return None
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_):
+                pass
+
+            def do_GET(self):
+                with github.lock:
+                    github.requests += 1
+                    failure = github.failures.pop(0) if github.failures else None
+
+                if failure is not None:
+                    status, headers = failure
+                    self.send_response(status)
+
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                resolved = github.resolve(self.path)
+
+                if resolved is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body, content_type = resolved
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                byte_range = parse_range(self.headers.get("Range"), len(body))
+
+                if byte_range is not None:
+                    start, end = byte_range
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                    body = body[start : end + 1]
+                else:
+                    self.send_response(200)
+
+                self.send_header("ETag", etag)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+                with github.lock:
+                    github.bytes_sent += len(body)
+
+        return Handler
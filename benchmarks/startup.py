@@ -0,0 +1,178 @@
+"""
+Measures DexI's cold start time and fails when it exceeds its budget.
+
+Every scenario runs DexI in a fresh interpreter with `python -X importtime`, recording
+the wall-clock time, the total import time and which heavy dependencies were loaded.
+
+Usage: python benchmarks/startup.py [--runs 5] [--scale 1.0] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(ROOT))
+
+from dexi.core.cache import CachedMetadata, write_metadata  # noqa: E402
+
+PACKAGES = 40
+
+ENTRYPOINT = "from dexi.app import app; app(prog_name='dexi')"
+
+# Wall-clock and import budgets are in milliseconds and multiplied by `--scale`.
+SCENARIOS = {
+    "help": {
+        "args": ["--help"],
+        "env": {},
+        "forbidden": ["requests", "tomlkit", "holidays", "packaging"],
+        "import_ms": 400,
+        "wall_ms": 800,
+    },
+    "list": {
+        "args": ["list", "--offline"],
+        "env": {},
+        "forbidden": ["requests", "holidays"],
+        "import_ms": 400,
+        "wall_ms": 1000,
+    },
+    "completion": {
+        "args": [],
+        "env": {
+            "_DEXI_COMPLETE": "complete_bash",
+            "COMP_WORDS": "dexi remove Author/",
+            "COMP_CWORD": "2",
+        },
+        "forbidden": ["requests", "rich", "tomlkit", "holidays", "packaging"],
+        "import_ms": 200,
+        "wall_ms": 500,
+    },
+}
+
+
+def create_project(path: Path, cache: Path):
+    """
+    Creates a Ballsdex project with cached metadata for every package.
+    """
+    (path / "ballsdex").mkdir()
+    (path / "ballsdex" / "__init__.py").write_text('__version__ = "2.29.5"\n')
+    (path / "config.yml").write_text("packages:\n\nextra-tortoise-models:\n")
+
+    entries = "\n".join(
+        f'    {{git = "Author/package-{i}", version = "1.0.0", branch = "main"}},'
+        for i in range(PACKAGES)
+    )
+
+    (path / "pyproject.toml").write_text(
+        f'[project]\nname = "ballsdex"\nversion = "2.29.5"\n\n'
+        f"[tool.dexi]\npackages = [\n{entries}\n]\n"
+    )
+
+    os.environ["DEXI_CACHE_DIR"] = str(cache)
+
+    for i in range(PACKAGES):
+        write_metadata(
+            f"Author/package-{i}@main",
+            CachedMetadata(
+                f'[project]\nname = "package-{i}"\nversion = "1.1.0"\n', None, time.time()
+            ),
+        )
+
+
+def parse_importtime(output: str) -> tuple[float, set[str]]:
+    """
+    Returns the total import time in milliseconds and the imported top-level modules.
+    """
+    total = 0
+    modules = set()
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, _, module = line.removeprefix("import time:").split("|")
+
+        total += int(self_time)
+        modules.add(module.strip().split(".")[0])
+
+    return total / 1000, modules
+
+
+def run(scenario: dict, project: Path) -> tuple[float, float, set[str]]:
+    env = {**os.environ, **scenario["env"], "PYTHONPATH": str(ROOT)}
+
+    start = time.perf_counter()
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", ENTRYPOINT, *scenario["args"]],
+        cwd=project,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    wall = (time.perf_counter() - start) * 1000
+    import_time, modules = parse_importtime(process.stderr)
+
+    return wall, import_time, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--output", type=Path)
+    arguments = parser.parse_args()
+
+    results = {}
+    failures = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        project = Path(directory) / "project"
+        project.mkdir()
+
+        create_project(project, Path(directory) / "cache")
+
+        for name, scenario in SCENARIOS.items():
+            runs = [run(scenario, project) for _ in range(arguments.runs)]
+
+            wall = statistics.median(wall for wall, _, _ in runs)
+            import_time = statistics.median(import_time for _, import_time, _ in runs)
+            loaded = sorted(set(scenario["forbidden"]) & runs[0][2])
+
+            results[name] = {"wall_ms": wall, "import_ms": import_time, "loaded": loaded}
+
+            print(
+                f"{name:<12} wall {wall:7.1f} ms  imports {import_time:7.1f} ms"
+                + (f"  loaded {', '.join(loaded)}" if loaded else "")
+            )
+
+            if loaded:
+                failures.append(f"{name} imported {', '.join(loaded)}")
+
+            for key in ("wall_ms", "import_ms"):
+                budget = scenario[key] * arguments.scale
+
+                if results[name][key] > budget:
+                    failures.append(
+                        f"{name} {key} {results[name][key]:.1f} exceeds {budget:.1f}"
+                    )
+
+    if arguments.output is not None:
+        arguments.output.write_text(json.dumps(results, indent=2))
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
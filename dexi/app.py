@@ -1,19 +1,81 @@
+import sys
+from pathlib import Path
+
 import typer
 from typing_extensions import Annotated
 
-from .commands.installer import install_packages
-from .commands.manager import (
-    add_package,
-    remove_package,
-    update_all_packages,
-    update_package,
-)
-from .commands.viewer import autocomplete_packages, list_packages
-from .core.errors import Errors
+from .commands.completion import autocomplete_packages
+from .core.constants import DEFAULT_JOBS
+
+# Command modules are imported inside each command so shell completion and
+# `--help` don't load the networking and TOML stacks.
 
 app = typer.Typer()
 
 
+@app.callback()
+def main(
+    ctx: typer.Context,
+    timings: bool = False,
+    trace_file: Annotated[Path | None, typer.Option(dir_okay=False)] = None,
+    project: Annotated[
+        list[Path] | None, typer.Option(exists=True, file_okay=False, resolve_path=True)
+    ] = None,
+    workspace: Annotated[
+        Path | None, typer.Option(exists=True, dir_okay=False, resolve_path=True)
+    ] = None,
+):
+    """
+    Manages DexI packages in a Ballsdex project.
+
+    Parameters
+    ----------
+    timings: bool
+        Whether a table of the time spent in each phase is printed afterwards.
+    trace_file: Path | None
+        A file a Chrome trace of every phase is written to afterwards.
+    project: list[Path] | None
+        Project roots the command runs in, instead of the current directory.
+    workspace: Path | None
+        A TOML file listing project roots in a `projects` array.
+    """
+    if timings or trace_file is not None:
+        from .core.timing import enable_timings, print_timings, write_trace
+
+        enable_timings()
+
+        def report():
+            if timings:
+                from .core.utils import console
+
+                print_timings(console)
+
+            if trace_file is not None:
+                write_trace(trace_file)
+
+        ctx.call_on_close(report)
+
+    projects = list(project or [])
+
+    if workspace is not None:
+        from .commands.workspace import read_workspace
+
+        projects += read_workspace(workspace)
+
+    if projects and ctx.invoked_subcommand is not None:
+        from .commands.workspace import jobs_argument, project_arguments, run_workspace
+        from .core.network import set_offline
+
+        arguments = project_arguments(sys.argv[1:])
+        set_offline("--offline" in arguments)
+
+        raise typer.Exit(
+            run_workspace(
+                ctx.invoked_subcommand, projects, arguments, jobs_argument(arguments)
+            )
+        )
+
+
 @app.command()
 def add(package: str, branch: str = "main"):
     """
@@ -26,9 +88,17 @@ def add(package: str, branch: str = "main"):
     branch: str
         The branch you want to add the package from.
     """
-    Errors(["invalid_project", "invalid_version", "no_config_found"]).check()
+    from .commands.manager import add_package
+    from .core.context import project_context
+    from .core.errors import Errors
+
+    with project_context() as context:
+        Errors(
+            ["invalid_project", "invalid_version", "no_config_found", "invalid_source"],
+            context,
+        ).check()
 
-    add_package(package.replace("https://github.com/", ""), branch)
+        add_package(context, package.replace("https://github.com/", ""), branch)
 
 
 @app.command()
@@ -48,9 +118,17 @@ def remove(
     package: str
         The package you want to remove.
     """
-    Errors(["invalid_project", "invalid_version", "no_config_found"]).check()
+    from .commands.manager import remove_package
+    from .core.context import project_context
+    from .core.errors import Errors
 
-    remove_package(package)
+    with project_context() as context:
+        Errors(
+            ["invalid_project", "invalid_version", "no_config_found", "invalid_source"],
+            context,
+        ).check()
+
+        remove_package(context, package)
 
 
 @app.command()
@@ -62,6 +140,8 @@ def update(
         ),
     ]
     | None = None,
+    jobs: Annotated[int, typer.Option(min=1)] = DEFAULT_JOBS,
+    offline: bool = False,
 ):
     """
     Updates all packages or a specified package.
@@ -71,18 +151,65 @@ def update(
     package: str
         The package you want to update.
         Automatically updates all packages if not specified.
+    jobs: int
+        The maximum amount of packages updated at the same time.
+    offline: bool
+        Whether packages should only be updated from the cache.
     """
-    Errors(["invalid_project", "invalid_version", "no_config_found"]).check()
+    from .commands.manager import update_all_packages, update_package
+    from .core.context import project_context
+    from .core.errors import Errors
+    from .core.network import configure_session, set_offline
+
+    set_offline(offline)
+
+    with project_context() as context:
+        Errors(
+            ["invalid_project", "invalid_version", "no_config_found", "invalid_source"],
+            context,
+        ).check()
 
-    if package is None:
-        update_all_packages()
-        return
+        if package is None:
+            configure_session(jobs)
+            update_all_packages(context, jobs)
+            return
 
-    update_package(package)
+        update_package(context, package)
 
 
 @app.command()
-def install(all: bool = False):
+def rollback(
+    package: Annotated[
+        str,
+        typer.Argument(
+            help="The name of the package", autocompletion=autocomplete_packages
+        ),
+    ],
+):
+    """
+    Restores the previously installed version of a package.
+
+    Parameters
+    ----------
+    package: str
+        The package you want to roll back.
+    """
+    from .commands.installer import rollback_package
+    from .core.context import project_context
+    from .core.errors import Errors
+
+    with project_context() as context:
+        Errors(["invalid_project", "invalid_version", "no_config_found"], context).check()
+
+        rollback_package(context, package)
+
+
+@app.command()
+def install(
+    all: bool = False,
+    jobs: Annotated[int, typer.Option(min=1)] = DEFAULT_JOBS,
+    offline: bool = False,
+):
     """
     Installs all packages.
 
@@ -91,14 +218,34 @@ def install(all: bool = False):
     all: bool
         Whether you want to install all packages,
         including ones that have already been installed.
+    jobs: int
+        The maximum amount of packages installed at the same time.
+    offline: bool
+        Whether packages should only be installed from the cache.
     """
-    Errors(["invalid_project", "invalid_version", "no_config_found"]).check()
+    from .commands.installer import install_packages
+    from .core.context import project_context
+    from .core.errors import Errors
+    from .core.network import configure_session, set_offline
+
+    set_offline(offline)
+    configure_session(jobs)
+
+    with project_context() as context:
+        Errors(
+            ["invalid_project", "invalid_version", "no_config_found", "invalid_source"],
+            context,
+        ).check()
 
-    install_packages(all)
+        install_packages(context, all, jobs)
 
 
 @app.command("list")
-def dlist(hide_update: bool = False):
+def dlist(
+    hide_update: bool = False,
+    offline: bool = False,
+    jobs: Annotated[int, typer.Option(min=1)] = DEFAULT_JOBS,
+):
     """
     Lists all packages.
 
@@ -106,7 +253,20 @@ def dlist(hide_update: bool = False):
     ----------
     hide_update: bool
         Whether packages should hide if an update is available.
+    offline: bool
+        Whether the latest versions should only be read from the cache.
+    jobs: int
+        The maximum amount of packages checked at the same time.
     """
-    Errors(["invalid_project"]).check()
+    from .commands.viewer import list_packages
+    from .core.context import project_context
+    from .core.errors import Errors
+    from .core.network import configure_session, set_offline
+
+    set_offline(offline)
+    configure_session(jobs)
+
+    with project_context() as context:
+        Errors(["invalid_project", "invalid_source"], context).check()
 
-    list_packages(hide_update)
+        list_packages(context, hide_update, offline, jobs)
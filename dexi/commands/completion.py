@@ -0,0 +1,5 @@
+from ..core.index import read_package_index
+
+
+def autocomplete_packages(incomplete: str) -> list[str]:
+    return [package for package in read_package_index() if package.startswith(incomplete)]
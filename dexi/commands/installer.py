@@ -1,82 +1,146 @@
-import io
-import os
 import random
 import shutil
 import zipfile
-from pathlib import Path
-from typing import cast
-
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable, cast
 
+from ..core.constants import DEFAULT_JOBS
+from ..core.context import ProjectContext
 from ..core.dexi_types import PackageEntry
+from ..core.extract import ExtractionTree, extract_archive, member_filter
 from ..core.fun import get_special
+from ..core.manifest import (
+    InstallManifest,
+    delete_manifest,
+    read_manifest,
+    write_manifest,
+)
+from ..core.network import NetworkError, is_offline
 from ..core.package import Package
+from ..core.sources import get_source
+from ..core.staging import (
+    discard_staging,
+    previous_path,
+    relocate_records,
+    retire_directory,
+    rollback_directory,
+    stage_directory,
+    swap_directory,
+)
+from ..core.store import file_store
+from ..core.timing import span
 from ..core.utils import (
     SUPPORTED_APP_VERSION,
     add_list_entry,
-    app_operations_supported,
     console,
     error,
+    fetch_commit,
     fetch_package,
     package_name,
-    parse_pyproject,
     remove_list_entry,
 )
 
 
-def uninstall_package(package: str):
+def uninstall_package(context: ProjectContext, package: str):
     """
     Uninstalls a package.
 
     Parameters
     ----------
+    context: ProjectContext
+        The project the package is uninstalled from.
     package: str
         The package you want to uninstall.
     """
-    project = parse_pyproject()
+    root = context.root
+    found_package = fetch_package(package, context.packages)
 
-    if "tool" not in project or "dexi" not in project["tool"]:  # type: ignore
+    if found_package is None:
+        error(f"Could not find [red]'{package}'[/red] package")
         return
 
-    dexi_tool = project["tool"].get("dexi", {})  # type: ignore
+    manifest = read_manifest(found_package.git, root)
 
-    found_package = fetch_package(package, dexi_tool["packages"])
+    if manifest is None:
+        # Installed before manifests existed, resolve it from the remote instead.
+        data = Package.from_git(found_package.git, found_package.branch)
+        manifest = InstallManifest.from_package(found_package.entry(), data)
 
-    if found_package is None:
-        error(f"Could not find [red]'{package}'[/red] package")
+        if not (root / manifest.paths[0]).is_dir():
+            return
+
+    if manifest.package.app is not None and not context.apps_supported:
         return
 
-    data = Package.from_git(found_package["git"], found_package["branch"])
+    for section, entries in manifest.config_entries.items():
+        for entry in entries:
+            remove_list_entry(section, entry, root)
 
-    if data.app is not None and not app_operations_supported():
-        return
+    for installed in manifest.paths:
+        shutil.rmtree(root / installed, ignore_errors=True)
 
-    destination = Path.cwd() / "ballsdex" / "packages" / data.package.target
+    previous = read_manifest(found_package.git, root, previous=True)
 
-    if not destination.is_dir():
-        return
+    for installed in {*manifest.paths, *(previous.paths if previous else [])}:
+        shutil.rmtree(previous_path(root / installed), ignore_errors=True)
+
+    delete_manifest(found_package.git, root)
+
+
+def _open_archive(
+    package: str, branch: str, members: Callable[[str], bool] | None = None
+) -> IO[bytes]:
+    """
+    Opens a package's archive from the package source.
+    """
+    name = package_name(package, branch)
+    source = get_source()
+
+    try:
+        archive = source.archive(package, branch, fetch_commit(package, branch), members)
+    except NetworkError as exception:
+        error(f"Failed to fetch [red]{name}[/red]: {exception}")
+
+    if archive is None:
+        if is_offline() and source.remote:
+            error(f"[red]{name}[/red] is not cached and cannot be installed offline")
+
+        error(f"Failed to fetch [red]{name}[/red]")
+
+    return cast(IO[bytes], archive)
 
-    if data.app is not None:
-        remove_list_entry(
-            "extra-tortoise-models",
-            f"ballsdex.packages.{data.package.target}.{data.app.models}",
-        )
 
-        remove_list_entry("extra-django-apps", data.app.target)
+def _remove_stale_install(
+    context: ProjectContext, previous: InstallManifest, manifest: InstallManifest
+):
+    """
+    Removes folders and config entries that a new install no longer uses.
 
-    remove_list_entry("packages", f"ballsdex.packages.{data.package.target}")
+    Removed folders are kept as their previous version, for `rollback_package`.
+    """
+    for section, entries in previous.config_entries.items():
+        for entry in entries:
+            if entry not in manifest.config_entries.get(section, []):
+                remove_list_entry(section, entry, context.root)
 
-    shutil.rmtree(destination)
+    for installed in previous.paths:
+        if installed not in manifest.paths:
+            retire_directory(context.path(installed))
 
 
 def install_package(
-    package: PackageEntry, cancel_if_exists: bool = False, output: bool = True
+    context: ProjectContext,
+    package: PackageEntry,
+    cancel_if_exists: bool = False,
+    output: bool = True,
 ) -> bool:
     """
     Installs a package.
 
     Parameters
     ----------
+    context: ProjectContext
+        The project the package is installed into.
     package: PackageEntry
         The package you want to install.
     cancel_if_exists: bool
@@ -84,114 +148,124 @@ def install_package(
     output: bool
         Whether you want to output the process to the console.
     """
+    repository = package["git"]
+    branch = package["branch"]
+
+    with span("install_package", package_name(repository, branch)):
+        return _install_package(context, package, cancel_if_exists, output)
+
+
+def _install_package(
+    context: ProjectContext, package: PackageEntry, cancel_if_exists: bool, output: bool
+) -> bool:
     replaced = False
 
+    root = context.root
     repository = package["git"]
     branch = package["branch"]
 
+    previous = read_manifest(repository, root)
+
+    if cancel_if_exists and previous is not None and previous.installed(root):
+        return False
+
     data = Package.from_git(repository, branch)
+    manifest = InstallManifest.from_package(package, data)
+
+    # Files recorded by the previous install are reused, not rewritten.
+    previous_records = None
 
-    author, repository = repository.split("/")
+    if previous is not None and previous.files and previous.installed(root):
+        previous_records = previous.file_records(root)
 
-    zip_url = f"https://github.com/{author}/{repository}/archive/refs/heads/{branch}.zip"
-    destination = Path.cwd() / "ballsdex" / "packages" / data.package.target
+    destination = root / "ballsdex" / "packages" / data.package.target
+    destinations = [destination]
 
-    name = package_name(repository, branch)
+    name = package_name(repository.split("/")[1], branch)
 
     if destination.is_dir():
-        if cancel_if_exists:
+        # Without a manifest, the package folder is the only sign of an install.
+        if cancel_if_exists and previous is None:
             return False
 
         replaced = True
-        shutil.rmtree(destination)
 
     if data.app is not None:
-        if not app_operations_supported():
+        if not context.apps_supported:
             error(
                 f"[red]DexI packages[/red] with Django apps are not supported on "
                 f"red]Ballsdex v$BD_V[/red], please update to v{SUPPORTED_APP_VERSION}+"
             )
 
-        app_destination = Path.cwd() / "admin_panel" / data.app.target
+        app_destination = root / "admin_panel" / data.app.target
+        destinations.append(app_destination)
 
         if app_destination.is_dir():
             replaced = True
-            shutil.rmtree(app_destination)
-
-        app_destination.mkdir(parents=True, exist_ok=True)
-
-    destination.mkdir(parents=True, exist_ok=True)
-
-    response = requests.get(zip_url)
-
-    if not response.ok:
-        error(f"Failed to fetch [red]{name}[/red]")
-
-    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-        base_folder = f"{repository}-{branch}/"
-
-        for member in z.namelist():
-            if member[-7:] in ["LICENSE", "LICENCE"]:
-                with z.open(member) as src, (destination / member[-7:]).open("wb") as dst:
-                    shutil.copyfileobj(src, dst)
-
-                continue
-
-            if not member.startswith(f"{base_folder}{data.package.source}/"):
-                continue
-
-            relative_path = member[len(base_folder + data.package.source) + 1 :]
-
-            if not relative_path or relative_path in data.package.exclude:
-                continue
 
-            target_path = destination / relative_path
+    members = [ExtractionTree(data.package.source, destination, data.package.exclude)]
 
-            if member.endswith("/"):
-                os.makedirs(target_path, exist_ok=True)
-                continue
-
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-
-            with z.open(member) as src, open(target_path, "wb") as dst:
-                shutil.copyfileobj(src, dst)
+    if data.app is not None:
+        members.append(ExtractionTree(data.app.source, app_destination))
+
+    # The installed folders are left untouched until the new version is complete.
+    with span("download"):
+        archive = _open_archive(repository, branch, member_filter(members))
+
+    try:
+        with span("stage"):
+            staged = {
+                target: stage_directory(target, previous_records is not None)
+                for target in destinations
+            }
+
+        trees = [
+            ExtractionTree(data.package.source, staged[destination], data.package.exclude)
+        ]
+
+        if data.app is not None:
+            trees.append(ExtractionTree(data.app.source, staged[app_destination]))
+
+        if previous_records is not None:
+            previous_records = relocate_records(previous_records, staged)
+
+        with archive, zipfile.ZipFile(archive) as z, span("extract") as extraction:
+            result = extract_archive(
+                z,
+                trees,
+                staged[destination],
+                previous=previous_records,
+                store=file_store(),
+            )
 
-        if data.app is not None:  # I'll refactor this later
-            if not app_destination:
-                # something has gone remarkably wrong
-                # (shouldnt be possible)
-                raise Exception(
-                    "Somehow app_destination has gone missing while copying files"
+            if extraction is not None:
+                extraction.details.update(
+                    files=result.files, skipped=result.skipped, written=result.bytes
                 )
 
-            for member in z.namelist():
-                if not member.startswith(f"{base_folder}{data.app.source}/"):
-                    continue
-
-                relative_path = member[len(base_folder + data.app.source) + 1 :]
-
-                if not relative_path:
-                    continue
+        with span("swap"):
+            for target in destinations:
+                swap_directory(target)
+    finally:
+        for target in destinations:
+            discard_staging(target)
 
-                target_path = app_destination / relative_path
-
-                if member.endswith("/"):
-                    target_path.mkdir(parents=True, exist_ok=True)
-                    continue
+    records = relocate_records(
+        result.records, {staging: target for target, staging in staged.items()}
+    )
 
-                target_path.parent.mkdir(parents=True, exist_ok=True)
+    if previous is not None:
+        _remove_stale_install(context, previous, manifest)
+        write_manifest(previous, root, previous=True)
 
-                with z.open(member) as src, target_path.open("wb") as dst:
-                    shutil.copyfileobj(src, dst)
+    manifest.record_files(records, root)
+    manifest.commit = fetch_commit(repository, branch)
 
-            add_list_entry(
-                "extra-tortoise-models",
-                f"ballsdex.packages.{data.package.target}.{data.app.models}",
-            )
+    for section, entries in manifest.config_entries.items():
+        for entry in entries:
+            add_list_entry(section, entry, root)
 
-            add_list_entry("extra-django-apps", data.app.target)
-
-    add_list_entry("packages", f"ballsdex.packages.{data.package.target}")
+    write_manifest(manifest, root)
 
     if not output:
         return True
@@ -210,38 +284,35 @@ def install_package(
     return True
 
 
-def install_packages(all: bool = False):
+def install_packages(
+    context: ProjectContext, all: bool = False, jobs: int = DEFAULT_JOBS
+):
     """
     Installs all packages found in the pyproject file.
 
     Parameters
     ----------
+    context: ProjectContext
+        The project the packages are installed into.
     all: bool
         Whether you want to install all packages,
         including ones that have already been installed.
+    jobs: int
+        The maximum amount of packages installed at the same time.
     """
-    project = parse_pyproject()
-
-    if "tool" not in project or "dexi" not in project["tool"]:  # type: ignore
-        print("No packages found to install")
-        return
-
-    packages = cast(list[PackageEntry], project["tool"]["dexi"].get("packages", []))  # type: ignore
+    packages = context.packages.entries()
 
     if not packages:
         print("No packages found to install")
         return
 
-    packages_installed = 0
-
     with console.status("[cyan]Installing packages..."):
-        while packages:
-            success = install_package(packages.pop(0), not all)
-
-            if not success:
-                continue
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(
+                lambda package: install_package(context, package, not all), packages
+            )
 
-            packages_installed += 1
+            packages_installed = sum(results)
 
         special = get_special()
 
@@ -253,3 +324,68 @@ def install_packages(all: bool = False):
             f"{emoji}{phrase} Installed "
             f"[bold]{packages_installed}[/bold] package{plural}!"
         )
+
+
+def rollback_package(context: ProjectContext, package: str):
+    """
+    Restores the previously installed version of a package.
+
+    Rolling back twice restores the version that was rolled back.
+
+    Parameters
+    ----------
+    context: ProjectContext
+        The project the package is rolled back in.
+    package: str
+        The package you want to roll back.
+    """
+    root = context.root
+    found_package = fetch_package(package, context.packages)
+
+    if found_package is None:
+        error(f"Could not find [red]'{package}'[/red] package")
+        return
+
+    repository = found_package.git
+
+    current = read_manifest(repository, root)
+    previous = read_manifest(repository, root, previous=True)
+
+    if (
+        current is None
+        or previous is None
+        or not all(previous_path(root / path).is_dir() for path in previous.paths)
+    ):
+        error(f"[red]{repository}[/red] has no previous version to roll back to")
+        return
+
+    with span("swap"):
+        for installed in {*current.paths, *previous.paths}:
+            rollback_directory(root / installed)
+
+    for section, entries in current.config_entries.items():
+        for entry in entries:
+            if entry not in previous.config_entries.get(section, []):
+                remove_list_entry(section, entry, root)
+
+    for section, entries in previous.config_entries.items():
+        for entry in entries:
+            if entry not in current.config_entries.get(section, []):
+                add_list_entry(section, entry, root)
+
+    write_manifest(previous, root)
+    write_manifest(current, root, previous=True)
+
+    found_package.branch = previous.branch
+    found_package.version = previous.package.version
+
+    context.save_packages()
+
+    name = package_name(repository, previous.branch)
+
+    console.print(
+        f"   [bold cyan]«[/bold cyan] [bold green]{name}[/bold green] "
+        f"[cyan]{current.package.version}[/cyan] → "
+        f"[bold cyan]{previous.package.version}[/bold cyan] "
+        "[bold green][ROLLED BACK][/bold green]"
+    )
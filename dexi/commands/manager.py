@@ -1,32 +1,38 @@
 import random
-from typing import cast
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 from packaging.specifiers import SpecifierSet
 from packaging.version import parse as parse_version
-from tomlkit import array, dumps, inline_table, nl, table
+from tomlkit import dumps, nl, table
 
 from ..commands.installer import install_package, uninstall_package
+from ..core.constants import DEFAULT_JOBS
+from ..core.context import ProjectContext
 from ..core.dexi_types import PackageEntry
 from ..core.fun import get_special
+from ..core.manifest import read_manifest
 from ..core.package import Package
+from ..core.packages import PackageRecord
 from ..core.utils import (
     console,
     error,
-    fetch_all_packages,
-    fetch_ballsdex_version,
+    fetch_commit,
     fetch_package,
     fetch_pyproject,
     package_name,
-    parse_pyproject,
+    write_pyproject,
 )
 
 
-def add_package(package: str, branch: str):
+def add_package(context: ProjectContext, package: str, branch: str):
     """
     Adds a package into the pyproject file.
 
     Parameters
     ----------
+    context: ProjectContext
+        The project the package is added to.
     package: str
         The package you want to add.
     branch: str
@@ -35,7 +41,7 @@ def add_package(package: str, branch: str):
     data = Package.from_git(package, branch)
 
     if data.ballsdex_version:
-        ballsdex = fetch_ballsdex_version()
+        ballsdex = context.ballsdex_version
 
         if not ballsdex:
             return
@@ -51,178 +57,178 @@ def add_package(package: str, branch: str):
                 f"version [red]'{ballsdex}'[/red]"
             )
 
-    project = parse_pyproject()
+    project = context.project.document
+    packages = context.packages
 
-    tool = project.setdefault("tool", table(True))
-    initialized = "dexi" not in tool
-    dexi = tool.setdefault("dexi", table())
-
-    if not initialized and fetch_package(package, fetch_all_packages()) is not None:
+    if package in packages:
         error("This [red]package[/red] has already been added")
 
-    package_array = dexi.setdefault("packages", array().multiline(True))
-
-    if len(package_array) == 0:
-        package_array = array().multiline(True)
-        dexi["packages"] = package_array
-
-    fields = {"git": package, "version": data.version, "branch": branch}
-
-    package_item = inline_table()
-    package_item.update(fields)
+    tool = project.setdefault("tool", table(True))
+    initialized = "dexi" not in tool
 
-    package_array.append(package_item)
+    packages.add(PackageRecord(package, branch, data.version))
+    packages.apply(project)
 
     if initialized:
-        dexi.add(nl())
+        tool["dexi"].add(nl())
 
-    with open("pyproject.toml", "w") as file:
-        output = dumps(project)
+    output = dumps(project)
 
-        if initialized and "\n\n[tool.dexi]" in output:  # Cheap way of doing this
-            output = output.replace("\n\n[tool.dexi]", "\n[tool.dexi]")
+    if initialized and "\n\n[tool.dexi]" in output:  # Cheap way of doing this
+        output = output.replace("\n\n[tool.dexi]", "\n[tool.dexi]")
 
-        file.write(output)
+    write_pyproject(output, context.root)
 
     name = package_name(package, branch)
 
     console.print(f"  [cyan]+[/cyan] [bold green]{name}[/bold green]=={data.version}")
 
 
-def remove_package(package: str):
+def remove_package(context: ProjectContext, package: str):
     """
     Removes a package from the pyproject file.
 
     Parameters
     ----------
+    context: ProjectContext
+        The project the package is removed from.
     package: str
         The package you want to remove.
     """
-    project = parse_pyproject()
+    record = fetch_package(package, context.packages)
 
-    if project is None:
-        print("Failed to fetch pyproject file")
+    if record is None:
+        error(f"Could not find [red]'{package}'[/red] package")
         return
 
-    if "tool" not in project or "dexi" not in project["tool"]:  # type: ignore
-        print("Could not find 'dexi' in pyproject.toml")
-        return
+    uninstall_package(context, package)
 
-    dexi_tool = project["tool"].get("dexi", {})  # type: ignore
+    context.packages.remove(record.git)
+    context.save_packages()
 
-    package_entry = fetch_package(package, dexi_tool["packages"])
+    name = package_name(package, record.branch)
 
-    if package_entry is None:
-        error(f"Could not find [red]'{package}'[/red] package")
-        return
+    console.print(
+        f"  [red]-[/red] [white]{name}[/white][grey46]=={record.version}[/grey46]"
+    )
 
-    uninstall_package(package)
 
-    dexi_tool["packages"].remove(package_entry)
+def package_changed(package: PackageEntry, path: Path | None = None) -> bool:
+    """
+    Returns whether a package has changed since it was installed.
 
-    if len(dexi_tool["packages"]) == 0:
-        dexi_tool["packages"] = array()
+    Compares the commit the package's branch points to with the commit recorded at
+    install time, which only needs a cheap ref lookup. Packages without a recorded
+    commit compare their remote version instead.
 
-    with open("pyproject.toml", "w") as file:
-        file.write(dumps(project))
+    Parameters
+    ----------
+    package: PackageEntry
+        The package you want to check.
+    path: Path | None
+        The project root.
+    """
+    manifest = read_manifest(package["git"], path)
+    commit = fetch_commit(package["git"], package["branch"])
 
-    name = package_name(package, package_entry["branch"])
+    if manifest is not None:
+        unchanged = manifest.at_commit(package, commit)
 
-    console.print(
-        f"  [red]-[/red] [white]{name}[/white]"
-        f"[grey46]=={package_entry['version']}[/grey46]"
-    )
+        if unchanged is not None:
+            return not unchanged
+
+    project = fetch_pyproject(package["git"], package["branch"])
+
+    return project["project"]["version"] != package["version"]
 
 
-def update_package(package: str | PackageEntry):
+def update_package(context: ProjectContext, package: str | PackageRecord):
     """
     Update a specified package.
 
     Parameters
     ----------
-    package: str | PackageEntry
+    context: ProjectContext
+        The project the package is updated in.
+    package: str | PackageRecord
         The package you want to update.
     """
-    fetched_package = package
-
     if isinstance(package, str):
-        package = cast(str, package)
-        packages = fetch_all_packages()
-
-        if not packages:
-            return False
-
-        package_entry = fetch_package(package, packages)
+        record = fetch_package(package, context.packages)
 
-        if package_entry is None:
+        if record is None:
             print(f"Could not find {package}")
             return False
 
-        fetched_package = package_entry
-
-    fetched_package = cast(PackageEntry, fetched_package)
+        package = record
 
-    project = fetch_pyproject(fetched_package["git"], fetched_package["branch"])
+    entry = package.entry()
 
-    name = package_name(fetched_package["git"], fetched_package["branch"])
-
-    project_version = project["project"]["version"]
-
-    if fetched_package["version"] == project_version:
+    if not package_changed(entry, context.root):
         return False
 
-    install_package(fetched_package, output=False)
+    project = fetch_pyproject(package.git, package.branch)
 
-    dexi_project = parse_pyproject()
+    name = package_name(package.git, package.branch)
 
-    if "tool" not in dexi_project or "dexi" not in dexi_project["tool"]:  # type: ignore
-        error("[red]pyproject.toml[/red] contains invalid [red]DexI data[/red]")
+    project_version = project["project"]["version"]
+    previous = read_manifest(package.git, context.root)
 
-    dexi_tool = dexi_project["tool"]["dexi"]  # type: ignore
+    install_package(context, entry, output=False)
 
-    if "packages" not in dexi_tool:  # type: ignore
-        error("[[red]pyproject.toml[/red] contains invalid [red]DexI data[/red]")
+    old_version = package.version
+    new_version = project_version
 
-    packages = dexi_tool["packages"]  # type: ignore
+    package.version = project_version
+    context.save_packages()
 
-    new_package = fetched_package.copy()
-    new_package["version"] = project_version
+    # Changes pushed without a version bump are told apart by their commit.
+    if old_version == new_version:
+        commit = fetch_commit(package.git, package.branch)
 
-    dexi_tool["packages"][packages.index(fetched_package)] = new_package  # type: ignore
+        if previous is not None and previous.commit is not None:
+            old_version += f"@{previous.commit[:7]}"
 
-    with open("pyproject.toml", "w") as file:
-        file.write(dumps(dexi_project))
+        if commit is not None:
+            new_version += f"@{commit[:7]}"
 
     console.print(
         f"   [bold cyan]»[/bold cyan] [bold green]{name}[/bold green] "
-        f"[cyan]{fetched_package['version']}[/cyan] → "
-        f"[bold cyan]{project_version}[/bold cyan] [bold green][UPDATED][/bold green]"
+        f"[cyan]{old_version}[/cyan] → "
+        f"[bold cyan]{new_version}[/bold cyan] [bold green][UPDATED][/bold green]"
     )
 
     return True
 
 
-def update_all_packages():
+def update_all_packages(context: ProjectContext, jobs: int = DEFAULT_JOBS):
     """
     Updates all packages.
+
+    Parameters
+    ----------
+    context: ProjectContext
+        The project the packages are updated in.
+    jobs: int
+        The maximum amount of packages updated at the same time.
     """
-    packages = fetch_all_packages()
+    packages = list(context.packages)
 
     if not packages:
         print("No packages found to update")
         return
 
-    outdated_packages = packages
-    packages_updated = 0
-
     with console.status("[cyan]Updating packages..."):
-        while outdated_packages:
-            success = update_package(outdated_packages.pop(0))
-
-            if not success:
-                continue
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            # Every package's ref is looked up first, so unchanged ones cost nothing.
+            results = executor.map(
+                lambda package: package_changed(package.entry(), context.root), packages
+            )
+            changed = [package for package, result in zip(packages, results) if result]
 
-            packages_updated += 1
+            packages_updated = sum(
+                executor.map(lambda package: update_package(context, package), changed)
+            )
 
         special = get_special()
 
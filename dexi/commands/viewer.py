@@ -1,42 +1,134 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from packaging.version import parse as parse_version
+from tomlkit import parse
+
+from ..core.cache import read_metadata
+from ..core.constants import DEFAULT_JOBS
+from ..core.context import ProjectContext
+from ..core.dexi_types import PackageEntry
+from ..core.manifest import read_manifest
+from ..core.sources import get_source
+from ..core.utils import console, fetch_commit, fetch_pyproject, package_name
 
-from ..core.utils import console, fetch_all_packages, fetch_pyproject, package_name
 
+def format_age(seconds: float) -> str:
+    """
+    Returns a short, human readable version of a duration.
+
+    Parameters
+    ----------
+    seconds: float
+        The duration in seconds.
+    """
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit}"
 
-def autocomplete_packages(incomplete: str) -> list[str]:
-    return [
-        package["git"]
-        for package in fetch_all_packages()
-        if package["git"].startswith(incomplete)
-    ]
+    return f"{int(seconds)}s"
 
 
-def list_packages(hide_update: bool = False):
+def package_row(
+    context: ProjectContext,
+    package: PackageEntry,
+    hide_update: bool = False,
+    offline: bool = False,
+) -> str:
     """
-    Displays a list of packages.
+    Returns the formatted list row of a package.
 
     Parameters
     ----------
+    context: ProjectContext
+        The project the package is listed in.
+    package: PackageEntry
+        The package you want to display.
     hide_update: bool
-        Whether packages should hide if an update is available.
+        Whether the row should hide if an update is available.
+    offline: bool
+        Whether the latest version should only be read from the cache.
     """
-    packages = fetch_all_packages()
+    name = package_name(package["git"], package["branch"])
+    notice = ""
+
+    project_version = None
+    manifest = read_manifest(package["git"], context.root)
 
-    for package in packages:
-        package_info = fetch_pyproject(package["git"], package["branch"])
+    # Local sources are read directly, they don't need a network or a cache.
+    if offline and get_source().remote:
+        cached = read_metadata(name)
 
-        project_version = package_info["project"]["version"]
-        notice = ""
+        if cached is None:
+            notice += " [grey46](not cached)[/grey46]"
+        else:
+            project_version = parse(cached.text)["project"]["version"]  # type: ignore
+            notice += (
+                f" [grey46](checked {format_age(time.time() - cached.fetched_at)} "
+                "ago)[/grey46]"
+            )
+    else:
+        commit = fetch_commit(package["git"], package["branch"])
+        unchanged = manifest.at_commit(package, commit) if manifest else None
+
+        # An unchanged commit can't have a newer version, so its pyproject is skipped.
+        if not unchanged:
+            package_info = fetch_pyproject(package["git"], package["branch"])
+            project_version = package_info["project"]["version"]
 
         if (
-            parse_version(project_version) > parse_version(package["version"])
+            unchanged is False
+            and project_version == package["version"]
+            and commit is not None
             and not hide_update
         ):
-            notice = f" → [yellow]v{project_version}[/yellow]"
+            notice = f" → [yellow]{commit[:7]}[/yellow]{notice}"
+
+    if (
+        project_version is not None
+        and parse_version(project_version) > parse_version(package["version"])
+        and not hide_update
+    ):
+        notice = f" → [yellow]v{project_version}[/yellow]{notice}"
+
+    if manifest is not None and not manifest.installed(context.root):
+        notice += " [grey46](not installed)[/grey46]"
+
+    return (
+        f"  [cyan]—[/cyan] [bold green]{name}[/bold green] "
+        f"[cyan]v{package['version']}[/cyan]{notice}"
+    )
+
+
+def list_packages(
+    context: ProjectContext,
+    hide_update: bool = False,
+    offline: bool = False,
+    jobs: int = DEFAULT_JOBS,
+):
+    """
+    Displays a list of packages.
+
+    Rows are printed as soon as their version check finishes.
+
+    Parameters
+    ----------
+    context: ProjectContext
+        The project whose packages are listed.
+    hide_update: bool
+        Whether packages should hide if an update is available.
+    offline: bool
+        Whether the latest versions should only be read from the cache.
+    jobs: int
+        The maximum amount of packages checked at the same time.
+    """
+    packages = context.packages.entries()
 
-        name = package_name(package["git"], package["branch"])
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(package_row, context, package, hide_update, offline)
+            for package in packages
+        ]
 
-        console.print(
-            f"  [cyan]—[/cyan] [bold green]{name}[/bold green] "
-            f"[cyan]v{package['version']}[/cyan]{notice}"
-        )
+        for future in as_completed(futures):
+            console.print(future.result())
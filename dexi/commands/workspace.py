@@ -0,0 +1,268 @@
+import os
+import subprocess
+import sys
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from ..core.constants import DEFAULT_JOBS
+from ..core.dexi_types import PackageEntry
+from ..core.manifest import read_manifest
+from ..core.network import NetworkError, configure_session
+from ..core.sources import get_source
+from ..core.timing import span
+from ..core.utils import (
+    PyprojectError,
+    console,
+    error,
+    fetch_commit,
+    load_pyproject,
+    package_name,
+)
+from .manager import package_changed
+
+# Options that only apply to the invocation running the workspace.
+WORKSPACE_OPTIONS = frozenset({"--project", "--workspace", "--trace-file"})
+WORKSPACE_FLAGS = frozenset({"--timings", "--no-timings"})
+
+
+def read_workspace(path: Path) -> list[Path]:
+    """
+    Returns the project roots listed in a workspace file.
+
+    The file is a TOML file with a `projects` array. Relative paths are resolved
+    from the file's folder.
+
+    Parameters
+    ----------
+    path: Path
+        The workspace file.
+    """
+    try:
+        with path.open("rb") as file:
+            workspace = tomllib.load(file)
+    except (OSError, tomllib.TOMLDecodeError) as exception:
+        error(f"Failed to read workspace [red]{path}[/red]: {exception}")
+        return []
+
+    projects = workspace.get("projects")
+
+    if not isinstance(projects, list) or not all(isinstance(p, str) for p in projects):
+        error(f"Workspace [red]{path}[/red] must contain a [red]projects[/red] array")
+        return []
+
+    return [(path.parent / project).resolve() for project in projects]
+
+
+def project_packages(path: Path) -> list[PackageEntry]:
+    """
+    Returns the packages of a project without loading TOML editing support.
+
+    Parameters
+    ----------
+    path: Path
+        The project root.
+    """
+    try:
+        with (path / "pyproject.toml").open("rb") as file:
+            project = tomllib.load(file)
+    except (OSError, tomllib.TOMLDecodeError):
+        return []
+
+    entries = project.get("tool", {}).get("dexi", {}).get("packages", [])
+
+    return [entry for entry in entries if "git" in entry and "branch" in entry]
+
+
+def _prefetch_package(
+    package: PackageEntry, command: str, projects: dict[Path, dict[str, PackageEntry]]
+):
+    # Failures are left for each project to report, instead of stopping every project.
+    try:
+        load_pyproject(package["git"], package["branch"])
+    except PyprojectError:
+        return
+
+    commit = fetch_commit(package["git"], package["branch"])
+
+    if command not in ("install", "update"):
+        return
+
+    # Only download archives that at least one project is going to extract.
+    for project, entries in projects.items():
+        entry = entries.get(package["git"])
+
+        if entry is None or entry["branch"] != package["branch"]:
+            continue
+
+        manifest = read_manifest(package["git"], project)
+
+        if command == "install" and (manifest is None or not manifest.installed(project)):
+            break
+
+        if command == "update" and package_changed(entry, project):
+            break
+    else:
+        return
+
+    try:
+        archive = get_source().archive(package["git"], package["branch"], commit)
+    except NetworkError:
+        return
+
+    if archive is not None:
+        archive.close()
+
+
+def prefetch(command: str, projects: list[Path], jobs: int = DEFAULT_JOBS):
+    """
+    Fetches every package used by a set of projects once, filling the cache.
+
+    Each `repository@branch` is fetched once, however many projects use it.
+
+    Parameters
+    ----------
+    command: str
+        The command that will run in each project.
+    projects: list[Path]
+        The project roots.
+    jobs: int
+        The maximum amount of packages fetched at the same time.
+    """
+    entries = {
+        project: {entry["git"]: entry for entry in project_packages(project)}
+        for project in projects
+    }
+
+    packages: dict[str, PackageEntry] = {}
+
+    for project_entries in entries.values():
+        for entry in project_entries.values():
+            packages.setdefault(package_name(entry["git"], entry["branch"]), entry)
+
+    configure_session(jobs)
+
+    with console.status(f"[cyan]Fetching {len(packages)} packages..."):
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for _ in executor.map(
+                lambda package: _prefetch_package(package, command, entries),
+                packages.values(),
+            ):
+                pass
+
+
+def project_arguments(arguments: list[str]) -> list[str]:
+    """
+    Returns command line arguments without the workspace-only options.
+
+    Parameters
+    ----------
+    arguments: list[str]
+        The arguments DexI was run with.
+    """
+    filtered = []
+    skip = False
+
+    for argument in arguments:
+        if skip:
+            skip = False
+            continue
+
+        option = argument.split("=", 1)[0]
+
+        if option in WORKSPACE_OPTIONS:
+            skip = "=" not in argument
+            continue
+
+        if option in WORKSPACE_FLAGS:
+            continue
+
+        filtered.append(argument)
+
+    return filtered
+
+
+def jobs_argument(arguments: list[str]) -> int:
+    """
+    Returns the value of the command's `--jobs` option, or the default.
+
+    Parameters
+    ----------
+    arguments: list[str]
+        The command line arguments, without workspace options.
+    """
+    for i, argument in enumerate(arguments):
+        option, equals, value = argument.partition("=")
+
+        if option != "--jobs":
+            continue
+
+        if not equals:
+            value = arguments[i + 1] if i + 1 < len(arguments) else ""
+
+        # Invalid values are reported by the command itself, in each project.
+        try:
+            return max(1, int(value))
+        except ValueError:
+            break
+
+    return DEFAULT_JOBS
+
+
+def run_workspace(
+    command: str, projects: list[Path], arguments: list[str], jobs: int = DEFAULT_JOBS
+) -> int:
+    """
+    Runs a command in every project of a workspace and returns its exit code.
+
+    Packages are fetched once into the shared cache first, then the command runs
+    in each project in parallel, reading from the cache.
+
+    Parameters
+    ----------
+    command: str
+        The name of the command.
+    projects: list[Path]
+        The project roots.
+    arguments: list[str]
+        The command line arguments, without workspace options.
+    jobs: int
+        The maximum amount of projects processed at the same time.
+    """
+    env = dict(os.environ)
+
+    if command in ("install", "update", "list"):
+        # Projects trust the metadata fetched from now on, instead of fetching it again.
+        env["DEXI_METADATA_FRESH_SINCE"] = repr(time.time())
+        prefetch(command, projects, jobs)
+
+    def run(project: Path) -> subprocess.CompletedProcess:
+        with span("project", str(project)):
+            return subprocess.run(
+                [sys.executable, "-m", "dexi", *arguments],
+                cwd=project,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+            )
+
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(run, project): project for project in projects}
+
+        for future in as_completed(futures):
+            result = future.result()
+            color = "green" if result.returncode == 0 else "red"
+
+            console.print(f"[bold {color}]{futures[future]}[/bold {color}]")
+            console.out(result.stdout.rstrip(), highlight=False)
+
+            if result.stderr.strip():
+                console.out(result.stderr.rstrip(), highlight=False)
+
+            failed += result.returncode != 0
+
+    return 1 if failed else 0
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO
+from urllib.parse import quote
+
+from .files import temporary_path, write_if_possible
+
+DEFAULT_METADATA_TTL = 60
+
+
+def cache_directory() -> Path:
+    """
+    Returns the per-user DexI cache directory.
+
+    Uses `DEXI_CACHE_DIR` if set, otherwise `$XDG_CACHE_HOME/dexi` or `~/.cache/dexi`.
+    """
+    if directory := os.environ.get("DEXI_CACHE_DIR"):
+        return Path(directory)
+
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+
+    return Path(base) / "dexi"
+
+
+def metadata_ttl() -> float:
+    """
+    Returns how many seconds cached metadata is trusted without revalidation.
+
+    Configured through the `DEXI_METADATA_TTL` environment variable.
+    """
+    try:
+        return float(os.environ.get("DEXI_METADATA_TTL", DEFAULT_METADATA_TTL))
+    except ValueError:
+        return DEFAULT_METADATA_TTL
+
+
+def metadata_fresh_since() -> float:
+    """
+    Returns the time after which fetched metadata is trusted, whatever its age.
+
+    Set through the `DEXI_METADATA_FRESH_SINCE` environment variable by workspaces,
+    which fetch the metadata of every package before running their projects.
+    """
+    try:
+        return float(os.environ.get("DEXI_METADATA_FRESH_SINCE", math.inf))
+    except ValueError:
+        return math.inf
+
+
+@dataclass
+class CachedMetadata:
+    """
+    A cached remote pyproject file.
+    """
+
+    text: str
+    etag: str | None = None
+    fetched_at: float = 0.0
+
+    @property
+    def fresh(self) -> bool:
+        if self.fetched_at >= metadata_fresh_since():
+            return True
+
+        return time.time() - self.fetched_at < metadata_ttl()
+
+
+def _metadata_path(key: str) -> Path:
+    return cache_directory() / "metadata" / f"{quote(key, safe='@')}.json"
+
+
+def read_metadata(key: str) -> CachedMetadata | None:
+    """
+    Returns the cached metadata stored under a key, if any.
+
+    Parameters
+    ----------
+    key: str
+        The cache key, formatted as `author/repository@branch`.
+    """
+    path = _metadata_path(key)
+
+    try:
+        with path.open() as file:
+            return CachedMetadata(**json.load(file))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def write_metadata(key: str, metadata: CachedMetadata):
+    """
+    Stores metadata under a key.
+
+    Parameters
+    ----------
+    key: str
+        The cache key, formatted as `author/repository@branch`.
+    metadata: CachedMetadata
+        The metadata that will be stored.
+    """
+    write_if_possible(_metadata_path(key), json.dumps(asdict(metadata)))
+
+
+def _archive_directory() -> Path:
+    return cache_directory() / "archives"
+
+
+def _archive_ref_path(key: str) -> Path:
+    return _archive_directory() / "refs" / f"{quote(key, safe='@')}.json"
+
+
+def _archive_commit_path(commit: str) -> Path:
+    return _archive_directory() / "commits" / commit
+
+
+def cached_archive(key: str, commit: str | None) -> Path | None:
+    """
+    Returns the path of a cached archive, if any.
+
+    Archives are looked up by commit SHA. Without a commit, the archive last stored
+    for the key is returned.
+
+    Parameters
+    ----------
+    key: str
+        The cache key, formatted as `author/repository@branch`.
+    commit: str | None
+        The commit SHA the archive was downloaded from.
+    """
+    try:
+        if commit is not None:
+            digest = _archive_commit_path(commit).read_text().strip()
+        else:
+            with _archive_ref_path(key).open() as file:
+                digest = json.load(file)["sha256"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+    path = _archive_directory() / f"{digest}.zip"
+
+    return path if path.is_file() else None
+
+
+def store_archive(
+    key: str, commit: str | None, file: IO[bytes], sha256: str
+) -> Path | None:
+    """
+    Stores an archive under its content hash and returns its path.
+
+    Returns `None` if the archive could not be written to the cache.
+
+    Parameters
+    ----------
+    key: str
+        The cache key, formatted as `author/repository@branch`.
+    commit: str | None
+        The commit SHA the archive was downloaded from, if known.
+    file: IO[bytes]
+        The archive's contents.
+    sha256: str
+        The SHA-256 digest of the archive's contents.
+    """
+    path = _archive_directory() / f"{sha256}.zip"
+
+    try:
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            temporary = temporary_path(path)
+
+            with temporary.open("wb") as destination:
+                shutil.copyfileobj(file, destination)
+
+            temporary.replace(path)
+
+        if commit is not None:
+            commit_path = _archive_commit_path(commit)
+            commit_path.parent.mkdir(parents=True, exist_ok=True)
+            commit_path.write_text(sha256)
+    except OSError:
+        return None
+    finally:
+        file.seek(0)
+
+    write_if_possible(
+        _archive_ref_path(key), json.dumps({"commit": commit, "sha256": sha256})
+    )
+
+    return path
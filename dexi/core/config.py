@@ -0,0 +1,196 @@
+import re
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from .files import write_atomically
+from .timing import span
+
+SECTION_RE = re.compile(r"^([^\s#-][^:]*):")
+
+_active: "ConfigTransaction | None" = None
+_active_lock = threading.Lock()
+
+
+class ConfigTransaction:
+    """
+    Batches list edits to a config file and writes them at once.
+
+    The file is read once, indexed by section, and rewritten atomically on commit.
+    """
+
+    def __init__(self, path: Path | None = None):
+        if path is None:
+            path = Path.cwd()
+
+        self.path = path / "config.yml"
+
+        self._lock = threading.Lock()
+        self._lines: list[str] | None = None
+        self._sections: dict[str, set[str]] = {}
+        self._added: dict[str, list[str]] = {}
+        self._removed: dict[str, set[str]] = {}
+
+    def _load(self) -> list[str]:
+        if self._lines is not None:
+            return self._lines
+
+        with self.path.open() as file:
+            self._lines = file.readlines()
+
+        section = None
+
+        for line in self._lines:
+            if match := SECTION_RE.match(line):
+                section = match.group(1) if line == f"{match.group(1)}:\n" else None
+
+                if section is not None:
+                    self._sections.setdefault(section, set())
+
+                continue
+
+            if section is not None and line.startswith("  - "):
+                self._sections[section].add(line[4:].rstrip("\n"))
+
+        return self._lines
+
+    def add(self, section: str, entry: str):
+        """
+        Adds an item to a list in the config file.
+
+        Parameters
+        ----------
+        section: str
+            The list that will be modified.
+        entry: str
+            The item that will be appended to the config list.
+        """
+        with self._lock:
+            self._load()
+
+            if section not in self._sections:
+                return
+
+            removed = self._removed.setdefault(section, set())
+            added = self._added.setdefault(section, [])
+
+            if entry in removed:
+                removed.discard(entry)
+            elif entry not in self._sections[section] and entry not in added:
+                added.append(entry)
+
+    def remove(self, section: str, entry: str):
+        """
+        Removes an item from a list in the config file.
+
+        Parameters
+        ----------
+        section: str
+            The list that will be modified.
+        entry: str
+            The item that will be removed from the config list.
+        """
+        with self._lock:
+            self._load()
+
+            if section not in self._sections:
+                return
+
+            added = self._added.setdefault(section, [])
+
+            if entry in added:
+                added.remove(entry)
+            elif entry in self._sections[section]:
+                self._removed.setdefault(section, set()).add(entry)
+
+    @property
+    def pending(self) -> bool:
+        return any(self._added.values()) or any(self._removed.values())
+
+    def commit(self):
+        """
+        Writes every pending edit to the config file.
+        """
+        with self._lock:
+            if self._lines is None or not self.pending:
+                return
+
+            output = []
+            section = None
+
+            for line in self._lines:
+                if match := SECTION_RE.match(line):
+                    section = match.group(1)
+                    output.append(line)
+                    output.extend(
+                        f"  - {entry}\n" for entry in self._added.get(section, [])
+                    )
+                    continue
+
+                if line.startswith("  - ") and section is not None:
+                    if line[4:].rstrip("\n") in self._removed.get(section, ()):
+                        continue
+
+                output.append(line)
+
+            with span("config_write"):
+                write_atomically(self.path, "".join(output))
+
+            for name, entries in self._added.items():
+                self._sections[name].update(entries)
+
+            for name, entries in self._removed.items():
+                self._sections[name].difference_update(entries)
+
+            self._lines = output
+            self._added.clear()
+            self._removed.clear()
+
+
+def active_transaction(path: Path | None = None) -> ConfigTransaction | None:
+    """
+    Returns the open config transaction for a project, if any.
+
+    Parameters
+    ----------
+    path: Path | None
+        The project root.
+    """
+    if path is None:
+        path = Path.cwd()
+
+    with _active_lock:
+        if _active is not None and _active.path == path / "config.yml":
+            return _active
+
+    return None
+
+
+@contextmanager
+def config_transaction(path: Path | None = None) -> Iterator[ConfigTransaction]:
+    """
+    Opens a config transaction used by every config edit until it closes.
+
+    Pending edits are written even if the command stops early, so the config file
+    always matches the packages that were installed.
+
+    Parameters
+    ----------
+    path: Path | None
+        The project root.
+    """
+    global _active
+
+    transaction = ConfigTransaction(path)
+
+    with _active_lock:
+        previous, _active = _active, transaction
+
+    try:
+        yield transaction
+    finally:
+        with _active_lock:
+            _active = previous
+
+        transaction.commit()
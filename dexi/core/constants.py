@@ -0,0 +1 @@
+DEFAULT_JOBS = 4
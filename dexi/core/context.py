@@ -0,0 +1,107 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import cached_property
+from pathlib import Path
+
+from packaging.version import parse as parse_version
+
+from .config import ConfigTransaction, config_transaction
+from .packages import PackageList
+from .project import ProjectTransaction, project_transaction
+from .utils import SUPPORTED_APP_VERSION, fetch_ballsdex_version
+
+_active: "ProjectContext | None" = None
+_active_lock = threading.Lock()
+
+
+class ProjectContext:
+    """
+    The Ballsdex project a command runs in, built once and passed to every step.
+
+    Holds the project root and the project and config transactions. The Ballsdex
+    version and pyproject file are read on first use and shared afterwards.
+    """
+
+    def __init__(
+        self, root: Path, project: ProjectTransaction, config: ConfigTransaction
+    ):
+        self.root = root
+        self.project = project
+        self.config = config
+
+    @cached_property
+    def ballsdex_version(self) -> str:
+        """
+        The version of Ballsdex the project runs.
+        """
+        return fetch_ballsdex_version(self.root)
+
+    @cached_property
+    def apps_supported(self) -> bool:
+        """
+        Whether the project's Ballsdex version supports packages with Django apps.
+        """
+        return parse_version(self.ballsdex_version) >= parse_version(
+            SUPPORTED_APP_VERSION
+        )
+
+    @property
+    def packages(self) -> PackageList:
+        """
+        The packages listed in the pyproject file.
+        """
+        return self.project.packages
+
+    def save_packages(self):
+        """
+        Marks changes made to `packages` to be written at the end of the command.
+        """
+        self.project.mark_dirty()
+
+    def path(self, relative: str) -> Path:
+        """
+        Returns the absolute path of a path relative to the project root.
+
+        Parameters
+        ----------
+        relative: str
+            The relative path.
+        """
+        return self.root / relative
+
+
+def active_context() -> ProjectContext | None:
+    """
+    Returns the context of the command that is running, if any.
+    """
+    with _active_lock:
+        return _active
+
+
+@contextmanager
+def project_context(path: Path | None = None) -> Iterator[ProjectContext]:
+    """
+    Opens the project and config transactions of a project, and returns its context.
+
+    Parameters
+    ----------
+    path: Path | None
+        The project root.
+    """
+    global _active
+
+    if path is None:
+        path = Path.cwd()
+
+    with project_transaction(path) as project, config_transaction(path) as config:
+        context = ProjectContext(path, project, config)
+
+        with _active_lock:
+            previous, _active = _active, context
+
+        try:
+            yield context
+        finally:
+            with _active_lock:
+                _active = previous
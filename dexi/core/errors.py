@@ -1,8 +1,11 @@
+import os
 from dataclasses import dataclass, field
 from pathlib import Path
 
 from packaging.version import parse as parse_version
 
+from .context import ProjectContext
+from .sources import source_from_string
 from .utils import error, fetch_ballsdex_version
 
 SUPPORTED_VERSION = "2.22.0"
@@ -15,6 +18,7 @@ class Errors:
     """
 
     errors: list[str] = field(default_factory=list[str])
+    context: ProjectContext | None = None
 
     @staticmethod
     def invalid_project() -> None:
@@ -30,9 +34,13 @@ class Errors:
 
         error("No [red]'config.yml'[/red] file detected")
 
-    @staticmethod
-    def invalid_version() -> None:
-        if parse_version(fetch_ballsdex_version()) >= parse_version(SUPPORTED_VERSION):
+    def invalid_version(self) -> None:
+        if self.context is not None:
+            version = self.context.ballsdex_version
+        else:
+            version = fetch_ballsdex_version()
+
+        if parse_version(version) >= parse_version(SUPPORTED_VERSION):
             return
 
         error(
@@ -40,6 +48,16 @@ class Errors:
             f"v{SUPPORTED_VERSION}+"
         )
 
+    @staticmethod
+    def invalid_source() -> None:
+        try:
+            source_from_string(os.environ.get("DEXI_SOURCE", "github"))
+        except ValueError:
+            error(
+                f"Unknown package source [red]'{os.environ['DEXI_SOURCE']}'[/red] "
+                "in [red]DEXI_SOURCE[/red]"
+            )
+
     def check(self):
         for project_error in self.errors:
             getattr(self, project_error)()
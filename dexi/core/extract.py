@@ -0,0 +1,277 @@
+import fnmatch
+import os
+import re
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, NamedTuple
+
+if TYPE_CHECKING:
+    from .store import FileStore
+
+LICENSE_NAMES = frozenset({"LICENSE", "LICENCE"})
+GLOB_CHARACTERS = frozenset("*?[")
+
+COPY_BUFFER = 1024 * 1024
+PARALLEL_THRESHOLD = 1024 * 1024
+DEFAULT_WORKERS = 4
+
+
+class FileRecord(NamedTuple):
+    """
+    Identity of an extracted file, used to skip unchanged files on later updates.
+
+    `crc` and `size` come from the archive, `mtime_ns` from the written file.
+    """
+
+    crc: int
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class ExtractionTree:
+    """
+    A folder inside an archive that will be extracted into a destination.
+    """
+
+    source: str
+    destination: Path
+    exclude: list[str] = field(default_factory=list[str])
+
+
+@dataclass
+class ExtractionResult:
+    """
+    Totals of an archive extraction.
+    """
+
+    files: int = 0
+    bytes: int = 0
+    skipped: int = 0
+    removed: int = 0
+    records: dict[Path, FileRecord] = field(default_factory=dict[Path, FileRecord])
+
+
+class _CompiledTree:
+    __slots__ = ("prefix", "destination", "excluded", "pattern")
+
+    def __init__(self, tree: ExtractionTree):
+        self.prefix = f"{tree.source.strip('/')}/"
+        self.destination = tree.destination
+
+        globs = [item for item in tree.exclude if GLOB_CHARACTERS & set(item)]
+
+        self.excluded = frozenset(tree.exclude) - frozenset(globs)
+        self.pattern = (
+            re.compile("|".join(fnmatch.translate(item) for item in globs))
+            if globs
+            else None
+        )
+
+    def excludes(self, relative_path: str) -> bool:
+        if relative_path in self.excluded:
+            return True
+
+        return self.pattern is not None and self.pattern.match(relative_path) is not None
+
+
+def member_filter(trees: list[ExtractionTree]) -> Callable[[str], bool]:
+    """
+    Returns a function telling whether `extract_archive` would use an archive member.
+
+    Parameters
+    ----------
+    trees: list[ExtractionTree]
+        The folders that will be extracted.
+    """
+    compiled = [_CompiledTree(tree) for tree in trees]
+
+    def wanted(name: str) -> bool:
+        if name[-7:] in LICENSE_NAMES:
+            return True
+
+        path = name.split("/", 1)[-1]
+
+        for tree in compiled:
+            if not path.startswith(tree.prefix):
+                continue
+
+            relative_path = path[len(tree.prefix) :]
+
+            if relative_path and not tree.excludes(relative_path):
+                return True
+
+        return False
+
+    return wanted
+
+
+def extract_archive(
+    archive: zipfile.ZipFile,
+    trees: list[ExtractionTree],
+    license_destination: Path | None = None,
+    workers: int = DEFAULT_WORKERS,
+    previous: dict[Path, FileRecord] | None = None,
+    store: "FileStore | None" = None,
+) -> ExtractionResult:
+    """
+    Extracts folders from a GitHub archive in a single pass over its members.
+
+    When `previous` holds the records of an earlier extraction into the same
+    destinations, only added or changed files are written and files that are no
+    longer in the archive are deleted.
+
+    Parameters
+    ----------
+    archive: zipfile.ZipFile
+        The archive, with every member nested inside one top-level folder.
+    trees: list[ExtractionTree]
+        The folders that will be extracted.
+    license_destination: Path | None
+        The folder the repository's license will be copied into, if any.
+    workers: int
+        The amount of threads used to decompress large members.
+    previous: dict[Path, FileRecord] | None
+        The file records returned by the previous extraction, if any.
+    store: FileStore | None
+        The file store written files are linked from, if any.
+    """
+    members = archive.infolist()
+
+    if previous is None:
+        previous = {}
+
+    if not members:
+        return ExtractionResult()
+
+    base = f"{members[0].filename.split('/', 1)[0]}/"
+    compiled = [_CompiledTree(tree) for tree in trees]
+
+    directories: set[Path] = set()
+    writes: list[tuple[zipfile.ZipInfo, Path]] = []
+
+    if license_destination is not None:
+        directories.add(license_destination)
+
+    for info in members:
+        name = info.filename
+
+        if name[-7:] in LICENSE_NAMES:
+            if license_destination is not None:
+                writes.append((info, license_destination / name[-7:]))
+
+            continue
+
+        if not name.startswith(base):
+            continue
+
+        path = name[len(base) :]
+
+        for tree in compiled:
+            if not path.startswith(tree.prefix):
+                continue
+
+            relative_path = path[len(tree.prefix) :]
+
+            if not relative_path or tree.excludes(relative_path):
+                continue
+
+            target_path = tree.destination / relative_path
+
+            if info.is_dir():
+                directories.add(target_path)
+                continue
+
+            directories.add(target_path.parent)
+            writes.append((info, target_path))
+
+    for directory in sorted(directories):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    records: dict[Path, FileRecord] = {}
+    changed: list[tuple[zipfile.ZipInfo, Path]] = []
+
+    for info, target_path in writes:
+        record = previous.get(target_path)
+
+        if record is not None and _unchanged(info, target_path, record):
+            records[target_path] = record
+            continue
+
+        changed.append((info, target_path))
+
+    def write(info: zipfile.ZipInfo, target_path: Path):
+        # Existing files may be hard links shared with another copy of the install,
+        # so they are replaced instead of overwritten.
+        target_path.unlink(missing_ok=True)
+
+        if store_tree is not None:
+            store_tree.materialize(info, target_path)
+        else:
+            with archive.open(info) as src, target_path.open("wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER)
+
+        records[target_path] = FileRecord(
+            info.CRC, info.file_size, target_path.stat().st_mtime_ns
+        )
+
+    store_tree = store.tree(archive) if store is not None and changed else None
+
+    large = [item for item in changed if item[0].file_size >= PARALLEL_THRESHOLD]
+
+    if workers <= 1 or len(large) <= 1:
+        for item in changed:
+            write(*item)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(write, *item) for item in large]
+
+            for item in changed:
+                if item[0].file_size < PARALLEL_THRESHOLD:
+                    write(*item)
+
+            for future in futures:
+                future.result()
+
+    if store_tree is not None:
+        store_tree.save()
+
+    removed = previous.keys() - records.keys()
+    roots = [tree.destination for tree in trees]
+
+    for removed_path in removed:
+        removed_path.unlink(missing_ok=True)
+        _prune_directories(removed_path.parent, roots)
+
+    return ExtractionResult(
+        len(changed),
+        sum(info.file_size for info, _ in changed),
+        len(writes) - len(changed),
+        len(removed),
+        records,
+    )
+
+
+def _unchanged(info: zipfile.ZipInfo, target_path: Path, record: FileRecord) -> bool:
+    if record.crc != info.CRC or record.size != info.file_size:
+        return False
+
+    try:
+        stat = target_path.stat()
+    except OSError:
+        return False
+
+    return stat.st_size == record.size and stat.st_mtime_ns == record.mtime_ns
+
+
+def _prune_directories(directory: Path, roots: list[Path]):
+    while directory not in roots and any(root in directory.parents for root in roots):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+
+        directory = directory.parent
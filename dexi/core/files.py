@@ -0,0 +1,91 @@
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+# Clones a file's blocks into another file, from linux/fs.h.
+FICLONE = 0x40049409
+
+
+def temporary_path(path: Path) -> Path:
+    """
+    Returns a path next to a file, unique to this thread, to write it atomically.
+
+    Parameters
+    ----------
+    path: Path
+        The file that will be written.
+    """
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_atomically(path: Path, text: str):
+    """
+    Replaces a file's contents in a single rename, keeping its permissions.
+
+    Parameters
+    ----------
+    path: Path
+        The file that will be written.
+    text: str
+        The file's new contents.
+    """
+    temporary = temporary_path(path)
+
+    try:
+        with temporary.open("w") as file:
+            file.write(text)
+
+        if path.exists():
+            shutil.copymode(path, temporary)
+
+        temporary.replace(path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def clone_file(source: Path, destination: Path):
+    """
+    Copies a file. On filesystems that support it, such as Btrfs and XFS, the copy
+    shares its blocks with the original until either of them is written.
+
+    Parameters
+    ----------
+    source: Path
+        The file that will be copied.
+    destination: Path
+        Where the copy is placed. Must not exist.
+    """
+    if sys.platform == "linux":
+        import fcntl
+
+        try:
+            with source.open("rb") as src, destination.open("xb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+            return
+        except OSError:
+            pass  # Not supported by the filesystem; the empty copy is overwritten.
+
+    shutil.copyfile(source, destination)
+
+
+def write_if_possible(path: Path, text: str):
+    """
+    Atomically writes a file that DexI can do without, such as a cache or index,
+    creating its directory and ignoring failures.
+
+    Parameters
+    ----------
+    path: Path
+        The file that will be written.
+    text: str
+        The file's new contents.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(path, text)
+    except OSError:
+        pass  # These files only make DexI faster; failing to write them is not fatal.
@@ -1,14 +1,10 @@
 from datetime import date
-
-import holidays
+from functools import cache
 
 from .dexi_types import SpecialMessage
 
 CURRENT_YEAR = date.today().year
 
-HOLIDAYS = holidays.country_holidays("US")
-HOLIDAYS.update({date(CURRENT_YEAR, 10, 31): "Halloween"})
-
 
 SPECIAL_MESSAGES: dict[str, SpecialMessage] = {
     "New Year's Day": {
@@ -30,8 +26,21 @@ SPECIAL_MESSAGES: dict[str, SpecialMessage] = {
 }
 
 
+@cache
+def get_holidays() -> dict[date, str]:
+    """
+    Returns this year's holidays, built the first time a special message is needed.
+    """
+    import holidays
+
+    active_holidays = holidays.country_holidays("US", years=CURRENT_YEAR)
+    active_holidays.update({date(CURRENT_YEAR, 10, 31): "Halloween"})
+
+    return active_holidays
+
+
 def get_special() -> SpecialMessage | None:
-    active_holiday = HOLIDAYS.get(date.today())
+    active_holiday = get_holidays().get(date.today())
 
     if active_holiday is None:
         return None
@@ -0,0 +1,81 @@
+import json
+import os
+import tomllib
+from pathlib import Path
+
+from .files import write_if_possible
+
+INDEX_PATH = Path(".dexi") / "packages.json"
+
+
+def read_package_index(path: Path | None = None) -> list[str]:
+    """
+    Returns the identifiers of every package in the pyproject file.
+
+    Reads a small index stored beside the project, which is rebuilt whenever the
+    pyproject file's modification time or size changes. Only uses the standard
+    library, so shell completion stays fast.
+
+    Parameters
+    ----------
+    path: Path | None
+        The project root.
+    """
+    if path is None:
+        path = Path.cwd()
+
+    try:
+        stat = (path / "pyproject.toml").stat()
+    except OSError:
+        return []
+
+    try:
+        with (path / INDEX_PATH).open() as file:
+            index = json.load(file)
+
+        if index["mtime_ns"] == stat.st_mtime_ns and index["size"] == stat.st_size:
+            return index["packages"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    try:
+        with (path / "pyproject.toml").open("rb") as file:
+            project = tomllib.load(file)
+    except (OSError, tomllib.TOMLDecodeError):
+        return []
+
+    entries = project.get("tool", {}).get("dexi", {}).get("packages", [])
+    packages = [entry["git"] for entry in entries if "git" in entry]
+
+    write_package_index(packages, path, stat)
+
+    return packages
+
+
+def write_package_index(
+    packages: list[str], path: Path | None = None, stat: os.stat_result | None = None
+):
+    """
+    Writes the package index of a project.
+
+    Parameters
+    ----------
+    packages: list[str]
+        The identifiers of every package in the pyproject file.
+    path: Path | None
+        The project root.
+    stat: os.stat_result | None
+        The pyproject file's status the packages were read from.
+    """
+    if path is None:
+        path = Path.cwd()
+
+    if stat is None:
+        try:
+            stat = (path / "pyproject.toml").stat()
+        except OSError:
+            return
+
+    index = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "packages": packages}
+
+    write_if_possible(path / INDEX_PATH, json.dumps(index))
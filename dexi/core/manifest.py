@@ -0,0 +1,208 @@
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Self
+from urllib.parse import quote
+
+from .dexi_types import PackageEntry
+from .extract import FileRecord
+from .files import write_atomically
+from .package import Package
+
+MANIFEST_DIRECTORY = Path(".dexi") / "manifests"
+
+
+@dataclass
+class InstallManifest:
+    """
+    Local record of an installed package, written at install time.
+    """
+
+    git: str
+    branch: str
+    package: Package
+
+    paths: list[str] = field(default_factory=list[str])
+    config_entries: dict[str, list[str]] = field(default_factory=dict[str, list[str]])
+    files: dict[str, FileRecord] = field(default_factory=dict[str, FileRecord])
+    commit: str | None = None
+
+    @classmethod
+    def from_package(cls, entry: PackageEntry, data: Package) -> Self:
+        """
+        Returns the manifest describing what installing a package writes.
+
+        Parameters
+        ----------
+        entry: PackageEntry
+            The package's pyproject entry.
+        data: Package
+            The package's resolved configuration.
+        """
+        target = data.package.target
+
+        paths = [f"ballsdex/packages/{target}"]
+        config_entries = {"packages": [f"ballsdex.packages.{target}"]}
+
+        if data.app is not None:
+            paths.append(f"admin_panel/{data.app.target}")
+
+            config_entries["extra-tortoise-models"] = [
+                f"ballsdex.packages.{target}.{data.app.models}"
+            ]
+            config_entries["extra-django-apps"] = [data.app.target]
+
+        return cls(entry["git"], entry["branch"], data, paths, config_entries)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        files = {
+            path: FileRecord(*record) for path, record in data.get("files", {}).items()
+        }
+
+        return cls(
+            **{**data, "package": Package.from_dict(data["package"]), "files": files}
+        )
+
+    def file_records(self, path: Path | None = None) -> dict[Path, FileRecord]:
+        """
+        Returns the recorded files keyed by their absolute path.
+
+        Parameters
+        ----------
+        path: Path | None
+            The project root.
+        """
+        if path is None:
+            path = Path.cwd()
+
+        return {path / file: record for file, record in self.files.items()}
+
+    def record_files(self, records: dict[Path, FileRecord], path: Path | None = None):
+        """
+        Stores file records, keyed by their path relative to the project root.
+
+        Parameters
+        ----------
+        records: dict[Path, FileRecord]
+            The records returned by an extraction.
+        path: Path | None
+            The project root.
+        """
+        if path is None:
+            path = Path.cwd()
+
+        self.files = {
+            file.relative_to(path).as_posix(): record for file, record in records.items()
+        }
+
+    def at_commit(self, package: PackageEntry, commit: str | None) -> bool | None:
+        """
+        Returns whether the install came from a branch's current commit.
+
+        Returns `None` if either commit is unknown.
+
+        Parameters
+        ----------
+        package: PackageEntry
+            The package's pyproject entry.
+        commit: str | None
+            The commit SHA the package's branch points to.
+        """
+        if commit is None or self.commit is None or self.branch != package["branch"]:
+            return None
+
+        return self.commit == commit
+
+    def installed(self, path: Path | None = None) -> bool:
+        """
+        Returns whether every path written by the install still exists.
+
+        Parameters
+        ----------
+        path: Path | None
+            The project root.
+        """
+        if path is None:
+            path = Path.cwd()
+
+        return all((path / installed).is_dir() for installed in self.paths)
+
+
+def manifest_path(package: str, path: Path | None = None, previous: bool = False) -> Path:
+    """
+    Returns the manifest file path of a package.
+
+    Parameters
+    ----------
+    package: str
+        The package's `author/repository` identifier.
+    path: Path | None
+        The project root.
+    previous: bool
+        Whether to return the manifest of the previously installed version.
+    """
+    if path is None:
+        path = Path.cwd()
+
+    suffix = ".previous.json" if previous else ".json"
+
+    return path / MANIFEST_DIRECTORY / f"{quote(package, safe='')}{suffix}"
+
+
+def read_manifest(
+    package: str, path: Path | None = None, previous: bool = False
+) -> InstallManifest | None:
+    """
+    Returns the install manifest of a package, if it has one.
+
+    Parameters
+    ----------
+    package: str
+        The package's `author/repository` identifier.
+    path: Path | None
+        The project root.
+    previous: bool
+        Whether to return the manifest of the previously installed version.
+    """
+    try:
+        with manifest_path(package, path, previous).open() as file:
+            return InstallManifest.from_dict(json.load(file))
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def write_manifest(
+    manifest: InstallManifest, path: Path | None = None, previous: bool = False
+):
+    """
+    Writes the install manifest of a package.
+
+    Parameters
+    ----------
+    manifest: InstallManifest
+        The manifest that will be written.
+    path: Path | None
+        The project root.
+    previous: bool
+        Whether the manifest belongs to the previously installed version.
+    """
+    destination = manifest_path(manifest.git, path, previous)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    write_atomically(destination, json.dumps(asdict(manifest), indent=2))
+
+
+def delete_manifest(package: str, path: Path | None = None):
+    """
+    Deletes the install manifests of a package, including the previous version's.
+
+    Parameters
+    ----------
+    package: str
+        The package's `author/repository` identifier.
+    path: Path | None
+        The project root.
+    """
+    manifest_path(package, path).unlink(missing_ok=True)
+    manifest_path(package, path, previous=True).unlink(missing_ok=True)
@@ -0,0 +1,269 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Self
+from urllib.parse import urlsplit
+
+from .. import __version__
+from .scheduler import (
+    MAX_ATTEMPTS,
+    RequestScheduler,
+    backoff_delay,
+    is_throttled,
+    remaining_requests,
+    retry_delay,
+)
+from .timing import record_bytes, record_request, span
+
+if TYPE_CHECKING:
+    import requests
+
+# Overridable so DexI can be pointed at a local stand-in server.
+GITHUB_URL = os.environ.get("DEXI_GITHUB_URL", "https://github.com").rstrip("/")
+RAW_URL = os.environ.get("DEXI_RAW_URL", "https://raw.githubusercontent.com").rstrip("/")
+
+DEFAULT_POOL_SIZE = 10
+REQUEST_TIMEOUT = (10, 60)
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 8 * 1024 * 1024
+
+_session: "requests.Session | None" = None
+_session_lock = threading.Lock()
+_schedulers: dict[str, RequestScheduler] = {}
+_pool_size = DEFAULT_POOL_SIZE
+
+_offline = False
+
+
+class NetworkError(Exception):
+    """
+    Raised when a request gets no response, even after being retried.
+    """
+
+
+def _build_session(pool_size: int) -> "requests.Session":
+    # requests is only imported once a request is made, keeping offline commands light.
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {"User-Agent": f"DexI/{__version__}", "Accept-Encoding": "gzip, deflate"}
+    )
+
+    return session
+
+
+def configure_session(pool_size: int = DEFAULT_POOL_SIZE):
+    """
+    Configures the shared HTTP session used for every request made by DexI.
+
+    The session itself is created by the first request.
+
+    Parameters
+    ----------
+    pool_size: int
+        The amount of connections kept alive per host.
+    """
+    global _session, _pool_size
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+
+        _session = None
+        _schedulers.clear()
+        _pool_size = pool_size
+
+
+def get_session() -> "requests.Session":
+    """
+    Returns the shared HTTP session, creating it if it doesn't exist yet.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = _build_session(_pool_size)
+
+        return _session
+
+
+def _get_scheduler(host: str) -> RequestScheduler:
+    # Hosts have their own rate limits, so one host's limit doesn't slow the others.
+    with _session_lock:
+        if host not in _schedulers:
+            _schedulers[host] = RequestScheduler(_pool_size)
+
+        return _schedulers[host]
+
+
+def set_offline(offline: bool):
+    """
+    Sets whether DexI is allowed to use the network.
+
+    Parameters
+    ----------
+    offline: bool
+        Whether every request should be served from the cache.
+    """
+    global _offline
+
+    _offline = offline
+
+
+def is_offline() -> bool:
+    """
+    Returns whether DexI is running without network access.
+    """
+    return _offline
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    """
+    Sends a GET request through the shared HTTP session.
+
+    Raises `NetworkError` if the request failed without a response.
+
+    Parameters
+    ----------
+    url: str
+        The URL you want to request.
+    **kwargs
+        Extra arguments passed to `requests.Session.get`.
+    """
+    import requests
+
+    if _offline:
+        raise RuntimeError(f"Attempted to request '{url}' while offline")
+
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+
+    host = urlsplit(url).netloc
+    session = get_session()
+    scheduler = _get_scheduler(host)
+
+    attempt = 0
+
+    # Failed requests are retried with backoff; throttled ones slow down every request.
+    while True:
+        last_attempt = attempt == MAX_ATTEMPTS - 1
+
+        with scheduler.slot():
+            record_request()
+
+            try:
+                response = session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exception:
+                if last_attempt:
+                    raise NetworkError(
+                        f"no response from {host} after {MAX_ATTEMPTS} attempts"
+                    ) from exception
+
+                response = None
+            except requests.RequestException as exception:
+                raise NetworkError(
+                    f"request to {host} failed: {exception}"
+                ) from exception
+
+        if response is None:
+            delay = backoff_delay(attempt)
+        else:
+            throttled = is_throttled(response)
+            retry = retry_delay(response, attempt)
+
+            if retry is None or last_attempt:
+                if not throttled:
+                    scheduler.succeeded(remaining_requests(response))
+
+                return response
+
+            delay = retry
+            response.close()
+
+            if throttled:
+                scheduler.throttled(delay)
+
+        with span("backoff"):
+            time.sleep(delay)
+
+        attempt += 1
+
+
+@dataclass
+class Download:
+    """
+    A downloaded file, kept in memory while small and spooled to disk otherwise.
+    """
+
+    file: IO[bytes]
+    size: int
+    sha256: str
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_):
+        self.file.close()
+
+
+def download(url: str) -> Download | None:
+    """
+    Streams a file into a temporary file, hashing it as it arrives.
+
+    Returns `None` if the server responded with an error, and raises `NetworkError`
+    if it didn't respond.
+
+    Parameters
+    ----------
+    url: str
+        The URL of the file you want to download.
+    """
+    with get(url, stream=True) as response:
+        if not response.ok:
+            return None
+
+        return spool_response(response)
+
+
+def spool_response(response: "requests.Response") -> Download:
+    """
+    Streams the body of a response into a temporary file, hashing it as it arrives.
+
+    Parameters
+    ----------
+    response: requests.Response
+        A response requested with `stream=True`.
+    """
+    import requests
+
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            file.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            record_bytes(len(chunk))
+    except requests.RequestException as exception:
+        file.close()
+
+        host = urlsplit(response.url).netloc
+        raise NetworkError(f"the download from {host} was interrupted") from exception
+    except BaseException:
+        file.close()
+        raise
+
+    file.seek(0)
+
+    return Download(file, size, digest.hexdigest())
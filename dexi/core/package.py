@@ -62,7 +62,7 @@ class Package:
         package_config = PackageConfig(
             dexi_package["source"],
             dexi_package["target"],
-            dexi_package.get("exclude", [])
+            dexi_package.get("exclude", []),
         )
 
         fields = {
@@ -82,3 +82,20 @@ class Package:
             fields["app"] = AppConfig(dexi_app["source"], dexi_app["target"], models)
 
         return cls(**fields)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        """
+        Returns a package from a dictionary created with `dataclasses.asdict`.
+
+        Parameters
+        ----------
+        data: dict
+            The package's data.
+        """
+        fields = {**data, "package": PackageConfig(**data["package"])}
+
+        if data.get("app") is not None:
+            fields["app"] = AppConfig(**data["app"])
+
+        return cls(**fields)
@@ -0,0 +1,188 @@
+from collections.abc import Iterable, Iterator
+
+from tomlkit import TOMLDocument, array, inline_table, table
+
+from .dexi_types import PackageEntry
+
+
+class AmbiguousPackageError(ValueError):
+    """
+    Raised when a bare repository name matches packages from several authors.
+    """
+
+    def __init__(self, name: str, matches: list[str]):
+        super().__init__(f"'{name}' matches {', '.join(matches)}")
+
+        self.name = name
+        self.matches = matches
+
+
+class PackageRecord:
+    """
+    A package listed in the pyproject file.
+    """
+
+    __slots__ = ("git", "branch", "version")
+
+    def __init__(self, git: str, branch: str, version: str):
+        self.git = git
+        self.branch = branch
+        self.version = version
+
+    def __repr__(self) -> str:
+        return f"PackageRecord({self.git!r}, {self.branch!r}, {self.version!r})"
+
+    @property
+    def name(self) -> str:
+        """
+        The package's repository name, without its author.
+        """
+        return self.git.split("/", 1)[-1]
+
+    @classmethod
+    def from_entry(cls, entry: PackageEntry) -> "PackageRecord":
+        return cls(entry["git"], entry["branch"], entry["version"])
+
+    def entry(self) -> PackageEntry:
+        """
+        Returns the package as a pyproject entry.
+        """
+        return {"git": self.git, "version": self.version, "branch": self.branch}
+
+
+class PackageList:
+    """
+    The packages listed in a pyproject file, indexed by `author/repository` and by
+    repository name.
+
+    Changes are made to the records and written back to the TOML document with
+    `apply`, keeping the rest of the document's formatting.
+    """
+
+    def __init__(self, records: Iterable[PackageRecord] = ()):
+        self._records: dict[str, PackageRecord] = {}
+        self._names: dict[str, list[str]] = {}
+
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def from_document(cls, document: TOMLDocument) -> "PackageList":
+        """
+        Returns the packages listed in a parsed pyproject file.
+
+        Parameters
+        ----------
+        document: TOMLDocument
+            The pyproject file.
+        """
+        entries = document.get("tool", {}).get("dexi", {}).get("packages", [])
+
+        return cls(PackageRecord.from_entry(entry) for entry in entries)
+
+    def __iter__(self) -> Iterator[PackageRecord]:
+        return iter(list(self._records.values()))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, git: str) -> bool:
+        return git in self._records
+
+    def find(self, package: str) -> PackageRecord | None:
+        """
+        Returns a package by its `author/repository` identifier or repository name.
+
+        Raises `AmbiguousPackageError` if a repository name matches several packages.
+
+        Parameters
+        ----------
+        package: str
+            The package's identifier or repository name.
+        """
+        if "/" in package:
+            return self._records.get(package)
+
+        matches = self._names.get(package, [])
+
+        if len(matches) > 1:
+            raise AmbiguousPackageError(package, matches)
+
+        return self._records[matches[0]] if matches else None
+
+    def add(self, record: PackageRecord):
+        """
+        Adds a package, or replaces the package with the same identifier.
+
+        Parameters
+        ----------
+        record: PackageRecord
+            The package.
+        """
+        if record.git not in self._records:
+            self._names.setdefault(record.name, []).append(record.git)
+
+        self._records[record.git] = record
+
+    def remove(self, git: str):
+        """
+        Removes a package.
+
+        Parameters
+        ----------
+        git: str
+            The package's `author/repository` identifier.
+        """
+        record = self._records.pop(git)
+        names = self._names[record.name]
+
+        names.remove(git)
+
+        if not names:
+            del self._names[record.name]
+
+    def entries(self) -> list[PackageEntry]:
+        """
+        Returns every package as a pyproject entry.
+        """
+        return [record.entry() for record in self._records.values()]
+
+    def apply(self, document: TOMLDocument):
+        """
+        Writes the packages into the `tool.dexi.packages` array of a pyproject file.
+
+        Existing entries are edited in place, so comments and formatting are kept.
+
+        Parameters
+        ----------
+        document: TOMLDocument
+            The pyproject file.
+        """
+        tool = document.setdefault("tool", table(True))
+        dexi = tool.setdefault("dexi", table())
+        entries = dexi.get("packages")
+
+        if not entries or not self._records:
+            dexi["packages"] = array().multiline(bool(self._records))
+            entries = dexi["packages"]
+
+        written = set()
+
+        for i in reversed(range(len(entries))):
+            record = self._records.get(entries[i]["git"])
+
+            if record is None or record.git in written:
+                del entries[i]
+                continue
+
+            written.add(record.git)
+
+            for key, value in record.entry().items():
+                if entries[i].get(key) != value:
+                    entries[i][key] = value
+
+        for record in self._records.values():
+            if record.git not in written:
+                item = inline_table()
+                item.update(record.entry())
+                entries.append(item)
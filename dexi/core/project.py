@@ -0,0 +1,138 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from tomlkit import TOMLDocument, dumps, parse
+
+from .files import write_atomically
+from .index import write_package_index
+from .packages import PackageList
+from .timing import span
+
+_active: "ProjectTransaction | None" = None
+_active_lock = threading.Lock()
+
+
+class ProjectTransaction:
+    """
+    A pyproject file shared by every step of a command and written once.
+
+    The file is parsed on first use. Changes are marked with `mark_dirty` and
+    written atomically on commit, along with changes made to `packages`.
+    """
+
+    def __init__(self, path: Path | None = None):
+        if path is None:
+            path = Path.cwd()
+
+        self.path = path / "pyproject.toml"
+        self.lock = threading.RLock()
+
+        self._document: TOMLDocument | None = None
+        self._packages: PackageList | None = None
+        self._dirty = False
+
+    @property
+    def document(self) -> TOMLDocument:
+        with self.lock:
+            if self._document is None:
+                with self.path.open() as file:
+                    self._document = parse(file.read())
+
+            return self._document
+
+    @property
+    def packages(self) -> PackageList:
+        """
+        The packages listed in the document, written back to it on commit.
+        """
+        with self.lock:
+            if self._packages is None:
+                self._packages = PackageList.from_document(self.document)
+
+            return self._packages
+
+    def mark_dirty(self):
+        """
+        Marks the document as changed, so it is written on commit.
+        """
+        with self.lock:
+            self._dirty = True
+
+    def write(self, text: str):
+        """
+        Immediately writes text to the pyproject file.
+
+        Parameters
+        ----------
+        text: str
+            The file's new contents, rendered from `document`.
+        """
+        with self.lock, span("pyproject_write"):
+            write_atomically(self.path, text)
+            self._dirty = False
+
+            write_package_index(
+                [record.git for record in self.packages], self.path.parent
+            )
+
+    def commit(self):
+        """
+        Writes the document if it was changed.
+        """
+        with self.lock:
+            if self._dirty and self._document is not None:
+                if self._packages is not None:
+                    self._packages.apply(self._document)
+
+                self.write(dumps(self._document))
+
+
+def active_project(path: Path | None = None) -> ProjectTransaction | None:
+    """
+    Returns the open project transaction for a project, if any.
+
+    Parameters
+    ----------
+    path: Path | None
+        The project root.
+    """
+    if path is None:
+        path = Path.cwd()
+
+    with _active_lock:
+        if _active is not None and _active.path == path / "pyproject.toml":
+            return _active
+
+    return None
+
+
+@contextmanager
+def project_transaction(path: Path | None = None) -> Iterator[ProjectTransaction]:
+    """
+    Opens a project transaction used by every pyproject read and write until it
+    closes.
+
+    Pending changes are written even if the command stops early, so the pyproject
+    file always matches the packages that were installed.
+
+    Parameters
+    ----------
+    path: Path | None
+        The project root.
+    """
+    global _active
+
+    transaction = ProjectTransaction(path)
+
+    with _active_lock:
+        previous, _active = _active, transaction
+
+    try:
+        yield transaction
+    finally:
+        with _active_lock:
+            _active = previous
+
+        transaction.commit()
@@ -0,0 +1,218 @@
+import bisect
+import hashlib
+import io
+import os
+import re
+import struct
+import zipfile
+from typing import Callable
+
+from .network import Download, download, get, spool_response
+from .timing import record_bytes
+
+# The end of central directory record is 22 bytes, followed by up to 64 KiB of comment.
+TAIL_SIZE = 22 + 0xFFFF
+
+# Members closer than this are fetched in one request, trading bytes for round trips.
+MERGE_GAP = 64 * 1024
+
+EOCD_SIGNATURE = b"PK\x05\x06"
+EOCD_FORMAT = "<4s4H2LH"
+
+CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+def partial_archives_enabled() -> bool:
+    """
+    Returns whether archives are fetched partially when the server supports it.
+
+    Enabled by setting the `DEXI_PARTIAL_ARCHIVES` environment variable to `1`.
+    """
+    return os.environ.get("DEXI_PARTIAL_ARCHIVES", "0") == "1"
+
+
+class SparseFile(io.RawIOBase):
+    """
+    A read-only file of which only some byte ranges are known.
+
+    Reading outside the known ranges raises `OSError`.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.position = 0
+
+        self._starts: list[int] = []
+        self._chunks: list[bytes] = []
+
+    def add(self, start: int, data: bytes):
+        """
+        Stores the bytes found at an offset.
+
+        Parameters
+        ----------
+        start: int
+            The offset of the first byte.
+        data: bytes
+            The bytes.
+        """
+        index = bisect.bisect(self._starts, start)
+
+        self._starts.insert(index, start)
+        self._chunks.insert(index, data)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+
+        self.position = max(0, offset)
+
+        return self.position
+
+    def readinto(self, buffer) -> int:  # type: ignore[override]
+        length = min(len(buffer), self.size - self.position)
+        read = 0
+
+        # Adjacent ranges are read in one call, as zipfile expects full reads.
+        while read < length:
+            index = bisect.bisect(self._starts, self.position) - 1
+            offset = self.position - self._starts[index] if index >= 0 else -1
+
+            if index < 0 or offset >= len(self._chunks[index]):
+                if read:
+                    break
+
+                raise OSError(f"Byte {self.position} of the archive was not fetched")
+
+            data = self._chunks[index][offset : offset + length - read]
+            buffer[read : read + len(data)] = data
+
+            read += len(data)
+            self.position += len(data)
+
+        return read
+
+
+def _fetch_range(url: str, start: int, end: int) -> bytes | None:
+    response = get(
+        url, headers={"Range": f"bytes={start}-{end}", "Accept-Encoding": "identity"}
+    )
+
+    if response.status_code != 206 or len(response.content) != end - start + 1:
+        return None
+
+    record_bytes(len(response.content))
+
+    return response.content
+
+
+def fetch_members(
+    url: str, wanted: Callable[[str], bool]
+) -> SparseFile | Download | None:
+    """
+    Fetches the members of a remote zip archive that are wanted, using HTTP range
+    requests.
+
+    The central directory is read from the end of the archive, then the byte ranges
+    of wanted members are fetched, merging ranges that are close together. If the
+    server ignores or refuses range requests, the whole archive is downloaded
+    instead.
+
+    Returns `None` if the server responded with an error.
+
+    Parameters
+    ----------
+    url: str
+        The URL of the archive.
+    wanted: Callable[[str], bool]
+        Whether an archive member, by name, is needed.
+    """
+    with get(
+        url,
+        headers={"Range": f"bytes=-{TAIL_SIZE}", "Accept-Encoding": "identity"},
+        stream=True,
+    ) as response:
+        if response.status_code == 200:
+            return spool_response(response)
+
+        content_range = CONTENT_RANGE_RE.fullmatch(
+            response.headers.get("Content-Range", "")
+        )
+
+        if response.status_code != 206 or content_range is None:
+            return download(url)
+
+        tail = response.content
+        record_bytes(len(tail))
+
+    size = int(content_range.group(3))
+    tail_start = size - len(tail)
+
+    # Small archives fit in the tail, and are complete.
+    if tail_start == 0:
+        return Download(io.BytesIO(tail), size, hashlib.sha256(tail).hexdigest())
+
+    file = SparseFile(size)
+    file.add(tail_start, tail)
+
+    eocd = tail.rfind(EOCD_SIGNATURE)
+
+    if eocd == -1 or len(tail) - eocd < struct.calcsize(EOCD_FORMAT):
+        return download(url)
+
+    _, _, _, _, entries, _, cd_offset, _ = struct.unpack_from(EOCD_FORMAT, tail, eocd)
+
+    # Zip64 archives store their real offsets elsewhere.
+    if cd_offset == 0xFFFFFFFF or entries == 0xFFFF:
+        return download(url)
+
+    if cd_offset < tail_start:
+        directory = _fetch_range(url, cd_offset, tail_start - 1)
+
+        if directory is None:
+            return download(url)
+
+        file.add(cd_offset, directory)
+
+    with zipfile.ZipFile(file) as archive:
+        members = sorted(archive.infolist(), key=lambda info: info.header_offset)
+
+    ranges: list[list[int]] = []
+
+    for i, info in enumerate(members):
+        if not wanted(info.filename) or info.is_dir():
+            continue
+
+        end = members[i + 1].header_offset if i + 1 < len(members) else cd_offset
+        end = min(end, tail_start)
+
+        if info.header_offset >= end:
+            continue
+
+        if ranges and info.header_offset - ranges[-1][1] <= MERGE_GAP:
+            ranges[-1][1] = end
+        else:
+            ranges.append([info.header_offset, end])
+
+    for start, end in ranges:
+        data = _fetch_range(url, start, end - 1)
+
+        if data is None:
+            return download(url)
+
+        file.add(start, data)
+
+    file.seek(0)
+
+    return file
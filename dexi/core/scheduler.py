@@ -0,0 +1,201 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    import requests
+
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+
+# Rate limits that reset later than this fail instead of stalling the command.
+MAX_WAIT = 60.0
+
+RETRIED_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RequestScheduler:
+    """
+    Limits the amount of requests in flight to one host, adapting to how the host
+    responds.
+
+    The limit grows by one request for every `limit` successful responses and is
+    halved when the server throttles DexI. A throttled response also pauses every
+    request until the server's delay has passed.
+    """
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+
+        self._condition = threading.Condition()
+        self._paused_until = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Waits until a request may be sent, and holds its place while it is sent.
+        """
+        with self._condition:
+            while True:
+                delay = self._paused_until - time.monotonic()
+
+                if delay <= 0 and self.in_flight < int(self.limit):
+                    break
+
+                self._condition.wait(delay if delay > 0 else None)
+
+            self.in_flight += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def succeeded(self, remaining: int | None = None):
+        """
+        Raises the limit after a successful response.
+
+        Parameters
+        ----------
+        remaining: int | None
+            The amount of requests the server still allows, from `X-RateLimit-Remaining`.
+        """
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            # Close to the rate limit, requests are spread out instead of bursting.
+            if remaining is not None and remaining < self.limit:
+                self.limit = max(1.0, float(remaining))
+
+            self._condition.notify_all()
+
+    def throttled(self, delay: float):
+        """
+        Halves the limit and pauses every request after a throttled response.
+
+        Parameters
+        ----------
+        delay: float
+            How many seconds to wait before sending the next request.
+        """
+        with self._condition:
+            self.limit = max(1.0, self.limit / 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Returns an exponential backoff delay with full jitter.
+
+    Parameters
+    ----------
+    attempt: int
+        The amount of attempts that already failed, starting at 0.
+    """
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2**attempt))
+
+
+def _header_float(response: "requests.Response", name: str) -> float | None:
+    try:
+        return float(response.headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def retry_after(response: "requests.Response") -> float | None:
+    """
+    Returns how many seconds the server asked to wait before retrying, if it did.
+
+    Reads `Retry-After`, then GitHub's `X-RateLimit-Reset` once no requests remain.
+
+    Parameters
+    ----------
+    response: requests.Response
+        The throttled response.
+    """
+    value = response.headers.get("Retry-After")
+
+    if value is not None:
+        if value.strip().isdigit():
+            return float(value)
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    reset = _header_float(response, "X-RateLimit-Reset")
+
+    if _header_float(response, "X-RateLimit-Remaining") == 0 and reset is not None:
+        return max(0.0, reset - time.time())
+
+    return None
+
+
+def is_throttled(response: "requests.Response") -> bool:
+    """
+    Returns whether a response means DexI is sending requests too fast.
+
+    GitHub answers rate limited requests with 429, or with 403 and either a
+    `Retry-After` header or no remaining requests.
+
+    Parameters
+    ----------
+    response: requests.Response
+        The response.
+    """
+    if response.status_code == 429:
+        return True
+
+    return response.status_code == 403 and (
+        "Retry-After" in response.headers
+        or response.headers.get("X-RateLimit-Remaining") == "0"
+    )
+
+
+def retry_delay(response: "requests.Response", attempt: int) -> float | None:
+    """
+    Returns how many seconds to wait before retrying a request, or `None` if the
+    response should be kept.
+
+    Server errors and throttled responses are retried, unless the server asks to
+    wait longer than `MAX_WAIT`.
+
+    Parameters
+    ----------
+    response: requests.Response
+        The response.
+    attempt: int
+        The amount of attempts that already failed, starting at 0.
+    """
+    if not is_throttled(response) and response.status_code not in RETRIED_STATUSES:
+        return None
+
+    delay = retry_after(response)
+
+    if delay is None:
+        return backoff_delay(attempt)
+
+    return delay if delay <= MAX_WAIT else None
+
+
+def remaining_requests(response: "requests.Response") -> int | None:
+    """
+    Returns the amount of requests the server still allows, if it says so.
+
+    Parameters
+    ----------
+    response: requests.Response
+        The response.
+    """
+    remaining = _header_float(response, "X-RateLimit-Remaining")
+
+    return int(remaining) if remaining is not None else None
@@ -0,0 +1,615 @@
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from functools import cache
+from pathlib import Path
+from typing import IO, Callable, cast
+
+from .cache import (
+    CachedMetadata,
+    cache_directory,
+    cached_archive,
+    read_metadata,
+    store_archive,
+    write_metadata,
+)
+from .network import (
+    GITHUB_URL,
+    RAW_URL,
+    SPOOL_SIZE,
+    NetworkError,
+    download,
+    get,
+    is_offline,
+)
+from .ranges import SparseFile, fetch_members, partial_archives_enabled
+from .timing import record_bytes, span
+
+IGNORED_FOLDERS = {".git", "__pycache__"}
+
+
+class Source(ABC):
+    """
+    Where package metadata and archives are fetched from.
+
+    Set with the `DEXI_SOURCE` environment variable, see `source_from_string`.
+    """
+
+    # Whether the source needs the network, and is therefore cached.
+    remote = False
+
+    @abstractmethod
+    def pyproject(self, package: str, branch: str) -> str | None:
+        """
+        Returns the text of a package's pyproject file, or `None` if it wasn't found.
+
+        Parameters
+        ----------
+        package: str
+            The package's `author/repository` identifier.
+        branch: str
+            The package's branch.
+        """
+
+    def commit(self, package: str, branch: str) -> str | None:
+        """
+        Returns the commit SHA a package's branch points to, if it can be resolved.
+
+        Parameters
+        ----------
+        package: str
+            The package's `author/repository` identifier.
+        branch: str
+            The package's branch.
+        """
+        return None
+
+    @abstractmethod
+    def archive(
+        self,
+        package: str,
+        branch: str,
+        commit: str | None = None,
+        members: Callable[[str], bool] | None = None,
+    ) -> IO[bytes] | None:
+        """
+        Opens a package's archive, or returns `None` if it wasn't found.
+
+        Every member of the archive is nested inside one top-level folder, like
+        GitHub's branch archives.
+
+        Parameters
+        ----------
+        package: str
+            The package's `author/repository` identifier.
+        branch: str
+            The package's branch.
+        commit: str | None
+            The commit SHA returned by `commit`, if any.
+        members: Callable[[str], bool] | None
+            Which members will be read from the archive, if known. Sources may leave
+            out the other members.
+        """
+
+
+class HTTPSource(Source):
+    """
+    A source served over HTTP, cached in the DexI cache directory.
+    """
+
+    remote = True
+
+    @abstractmethod
+    def pyproject_url(self, author: str, repository: str, branch: str) -> str: ...
+
+    def commit_url(self, author: str, repository: str, branch: str) -> str | None:
+        return None
+
+    @abstractmethod
+    def archive_url(
+        self, author: str, repository: str, branch: str, commit: str | None = None
+    ) -> str: ...
+
+    def pyproject(self, package: str, branch: str) -> str | None:
+        author, repository = package.split("/")
+
+        return fetch_cached(
+            f"{package}@{branch}", self.pyproject_url(author, repository, branch)
+        )
+
+    def commit(self, package: str, branch: str) -> str | None:
+        author, repository = package.split("/")
+        url = self.commit_url(author, repository, branch)
+
+        if url is None or is_offline():
+            return None
+
+        try:
+            return fetch_cached(
+                f"{package}@{branch}#commit",
+                url,
+                parse=lambda body: advertised_commit(body, f"refs/heads/{branch}"),
+            )
+        except NetworkError:
+            return None
+
+    def archive(
+        self,
+        package: str,
+        branch: str,
+        commit: str | None = None,
+        members: Callable[[str], bool] | None = None,
+    ) -> IO[bytes] | None:
+        author, repository = package.split("/")
+        key = f"{package}@{branch}"
+
+        # Without a commit, the cached archive may be outdated unless offline.
+        if commit is not None or is_offline():
+            cached = cached_archive(key, commit)
+
+            if cached is not None:
+                return cached.open("rb")
+
+        if is_offline():
+            return None
+
+        url = self.archive_url(author, repository, branch, commit)
+
+        if members is not None and partial_archives_enabled():
+            archive = fetch_members(url, members)
+        else:
+            archive = download(url)
+
+        if archive is None:
+            return None
+
+        # Partial archives aren't cached, as later installs may need other members.
+        if isinstance(archive, SparseFile):
+            return cast(IO[bytes], archive)
+
+        stored = store_archive(key, commit, archive.file, archive.sha256)
+
+        if stored is None:
+            return archive.file
+
+        archive.file.close()
+
+        return stored.open("rb")
+
+
+class GitHubSource(HTTPSource):
+    """
+    Packages fetched from GitHub.
+    """
+
+    def pyproject_url(self, author: str, repository: str, branch: str) -> str:
+        return f"{RAW_URL}/{author}/{repository}/{branch}/pyproject.toml"
+
+    def commit_url(self, author: str, repository: str, branch: str) -> str | None:
+        # Git's ref advertisement isn't subject to the REST API's rate limit.
+        return f"{GITHUB_URL}/{author}/{repository}.git/info/refs?service=git-upload-pack"
+
+    def archive_url(
+        self, author: str, repository: str, branch: str, commit: str | None = None
+    ) -> str:
+        # The branch may move after its commit was resolved, but the commit can't.
+        ref = commit if commit is not None else f"refs/heads/{branch}"
+
+        return f"{GITHUB_URL}/{author}/{repository}/archive/{ref}.zip"
+
+
+class MirrorSource(HTTPSource):
+    """
+    Packages fetched from an HTTP mirror.
+
+    The mirror serves `<url>/<author>/<repository>/<branch>/pyproject.toml` and
+    `<url>/<author>/<repository>/<branch>.zip`.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def pyproject_url(self, author: str, repository: str, branch: str) -> str:
+        return f"{self.url}/{author}/{repository}/{branch}/pyproject.toml"
+
+    def archive_url(
+        self, author: str, repository: str, branch: str, commit: str | None = None
+    ) -> str:
+        return f"{self.url}/{author}/{repository}/{branch}.zip"
+
+
+class ArchiveDirectorySource(Source):
+    """
+    Packages read from a directory of pre-fetched archives, stored as
+    `<path>/<author>/<repository>/<branch>.zip`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _archive_path(self, package: str, branch: str) -> Path:
+        return self.path / package / f"{branch}.zip"
+
+    def pyproject(self, package: str, branch: str) -> str | None:
+        try:
+            with zipfile.ZipFile(self._archive_path(package, branch)) as archive:
+                members = archive.namelist()
+
+                if not members:
+                    return None
+
+                base = members[0].split("/", 1)[0]
+
+                return archive.read(f"{base}/pyproject.toml").decode()
+        except (OSError, KeyError, zipfile.BadZipFile):
+            return None
+
+    def archive(
+        self,
+        package: str,
+        branch: str,
+        commit: str | None = None,
+        members: Callable[[str], bool] | None = None,
+    ) -> IO[bytes] | None:
+        try:
+            return self._archive_path(package, branch).open("rb")
+        except OSError:
+            return None
+
+
+class CheckoutDirectorySource(Source):
+    """
+    Packages read from a directory of local checkouts, stored as
+    `<path>/<author>/<repository>`.
+
+    The branch is ignored; whatever is checked out is installed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def pyproject(self, package: str, branch: str) -> str | None:
+        try:
+            return (self.path / package / "pyproject.toml").read_text()
+        except OSError:
+            return None
+
+    def archive(
+        self,
+        package: str,
+        branch: str,
+        commit: str | None = None,
+        members: Callable[[str], bool] | None = None,
+    ) -> IO[bytes] | None:
+        checkout = self.path / package
+
+        if not checkout.is_dir():
+            return None
+
+        base = f"{package.split('/')[1]}-{branch.replace('/', '-')}"
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+        # Files are stored uncompressed, so archiving costs little more than a copy.
+        with zipfile.ZipFile(file, "w", zipfile.ZIP_STORED) as archive:
+            for directory, folders, files in os.walk(checkout):
+                folders[:] = sorted(set(folders) - IGNORED_FOLDERS)
+
+                relative = Path(directory).relative_to(checkout)
+
+                for name in sorted(files):
+                    member = f"{base}/{relative / name}"
+
+                    if members is None or members(member):
+                        archive.write(os.path.join(directory, name), member)
+
+        file.seek(0)
+
+        return cast(IO[bytes], file)
+
+
+class GitMirrorSource(Source):
+    """
+    Packages fetched from git repositories, stored as `<url>/<author>/<repository>`.
+
+    Each repository is kept as a bare mirror in the DexI cache directory. Updating
+    a mirror only transfers the objects it doesn't have yet, and archives are
+    exported from the mirror, so only the files an install needs are read.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+        self._lock = threading.Lock()
+        self._locks: dict[str, threading.Lock] = {}
+        self._commits: dict[str, str] = {}
+
+    def _mirror_path(self, package: str) -> Path:
+        return cache_directory() / "git" / f"{package}.git"
+
+    def _git(self, package: str, *arguments: str) -> bytes | None:
+        try:
+            return subprocess.run(
+                ["git", "-C", str(self._mirror_path(package)), *arguments],
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                check=True,
+            ).stdout
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _fetch(self, package: str, branch: str) -> bool:
+        mirror = self._mirror_path(package)
+
+        if not mirror.is_dir():
+            try:
+                mirror.parent.mkdir(parents=True, exist_ok=True)
+                subprocess.run(
+                    ["git", "init", "--quiet", "--bare", str(mirror)],
+                    capture_output=True,
+                    check=True,
+                )
+            except (OSError, subprocess.CalledProcessError):
+                return False
+
+        with span("git_fetch"):
+            return (
+                self._git(
+                    package,
+                    "fetch",
+                    "--quiet",
+                    "--no-tags",
+                    f"{self.url}/{package}",
+                    f"+refs/heads/{branch}:refs/heads/{branch}",
+                )
+                is not None
+            )
+
+    def commit(self, package: str, branch: str) -> str | None:
+        key = f"{package}@{branch}#git"
+
+        with self._lock:
+            lock = self._locks.setdefault(package, threading.Lock())
+
+        # Git fetches into the same mirror can't run at the same time.
+        with lock:
+            if key in self._commits:
+                return self._commits[key]
+
+            cached = read_metadata(key)
+
+            if cached is not None and (cached.fresh or is_offline()):
+                return cached.text
+
+            if not is_offline() and not self._fetch(package, branch):
+                return None
+
+            output = self._git(package, "rev-parse", "--verify", f"refs/heads/{branch}")
+
+            if output is None:
+                return None
+
+            commit = output.decode().strip()
+            write_metadata(key, CachedMetadata(commit, None, time.time()))
+
+            # Fetched once per command, even when metadata is never trusted.
+            self._commits[key] = commit
+
+        return commit
+
+    def pyproject(self, package: str, branch: str) -> str | None:
+        commit = self.commit(package, branch)
+
+        if commit is None:
+            return None
+
+        text = self._git(package, "show", f"{commit}:pyproject.toml")
+
+        return text.decode() if text is not None else None
+
+    def archive(
+        self,
+        package: str,
+        branch: str,
+        commit: str | None = None,
+        members: Callable[[str], bool] | None = None,
+    ) -> IO[bytes] | None:
+        if commit is None:
+            commit = self.commit(package, branch)
+
+        if commit is None:
+            return None
+
+        listing = self._git(package, "ls-tree", "-r", "-z", "--full-tree", commit)
+
+        if listing is None:
+            return None
+
+        base = f"{package.split('/')[1]}-{branch.replace('/', '-')}"
+        blobs: list[tuple[str, str]] = []
+
+        for line in listing.decode().split("\0"):
+            if not line:
+                continue
+
+            info, _, path = line.partition("\t")
+            mode, kind, sha = info.split()
+
+            # Submodules and symbolic links have no contents to install.
+            if kind != "blob" or mode == "120000":
+                continue
+
+            if members is None or members(f"{base}/{path}"):
+                blobs.append((sha, path))
+
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+
+        try:
+            with (
+                subprocess.Popen(
+                    ["git", "-C", str(self._mirror_path(package)), "cat-file", "--batch"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                ) as process,
+                zipfile.ZipFile(file, "w", zipfile.ZIP_STORED) as archive,
+            ):
+                stdin = cast(IO[bytes], process.stdin)
+                stdout = cast(IO[bytes], process.stdout)
+
+                for sha, path in blobs:
+                    stdin.write(f"{sha}\n".encode())
+                    stdin.flush()
+
+                    size = int(stdout.readline().split()[2])
+                    archive.writestr(f"{base}/{path}", stdout.read(size))
+                    stdout.read(1)
+
+                stdin.close()
+        except (OSError, ValueError, IndexError):
+            file.close()
+            return None
+
+        file.seek(0)
+
+        return cast(IO[bytes], file)
+
+
+def source_from_string(value: str) -> Source:
+    """
+    Returns the source described by a string.
+
+    - `github` - GitHub. (default)
+    - `http://...` or `https://...` - An HTTP mirror, see `MirrorSource`.
+    - `archives:<path>` - A directory of archives, see `ArchiveDirectorySource`.
+    - `checkouts:<path>` - A directory of checkouts, see `CheckoutDirectorySource`.
+    - `git:<url>` - Git repositories, mirrored locally, see `GitMirrorSource`.
+
+    Parameters
+    ----------
+    value: str
+        The source's description.
+    """
+    kind, _, location = value.partition(":")
+
+    if value in ("", "github"):
+        return GitHubSource()
+
+    if kind in ("http", "https"):
+        return MirrorSource(value)
+
+    if kind == "archives":
+        return ArchiveDirectorySource(Path(location).expanduser())
+
+    if kind == "checkouts":
+        return CheckoutDirectorySource(Path(location).expanduser())
+
+    if kind == "git" and location:
+        return GitMirrorSource(location)
+
+    raise ValueError(f"Unknown package source '{value}'")
+
+
+@cache
+def get_source() -> Source:
+    """
+    Returns the source set with the `DEXI_SOURCE` environment variable.
+    """
+    return source_from_string(os.environ.get("DEXI_SOURCE", "github"))
+
+
+def advertised_commit(advertisement: bytes, ref: str) -> str | None:
+    """
+    Returns the commit SHA of a ref in a git smart HTTP ref advertisement.
+
+    Parameters
+    ----------
+    advertisement: bytes
+        The body of `info/refs?service=git-upload-pack`, as pkt-lines.
+    ref: str
+        The full name of the ref, such as `refs/heads/main`.
+    """
+    target = ref.encode()
+    position = 0
+
+    while position + 4 <= len(advertisement):
+        try:
+            length = int(advertisement[position : position + 4], 16)
+        except ValueError:
+            return None
+
+        # Flush packets are only a length, and carry no ref.
+        if length < 4:
+            position += 4
+            continue
+
+        line = advertisement[position + 4 : position + length]
+        position += length
+
+        sha, _, name = line.rstrip(b"\n").split(b"\0", 1)[0].partition(b" ")
+
+        if name == target:
+            return sha.decode()
+
+    return None
+
+
+def fetch_cached(
+    key: str,
+    url: str,
+    headers: dict[str, str] | None = None,
+    parse: Callable[[bytes], str | None] | None = None,
+) -> str | None:
+    """
+    Returns the text of a URL through the on-disk metadata cache.
+
+    Returns `None` if the request failed, or if offline and nothing is cached.
+
+    Parameters
+    ----------
+    key: str
+        The cache key, formatted as `author/repository@branch`.
+    url: str
+        The URL fetched when the cache is missing or stale.
+    headers: dict[str, str] | None
+        Extra request headers.
+    parse: Callable[[bytes], str | None] | None
+        Turns the response's body into the text that is cached, or `None` if the
+        body holds nothing useful.
+    """
+    cached = read_metadata(key)
+
+    if cached is not None and (cached.fresh or is_offline()):
+        return cached.text
+
+    if is_offline():
+        return None
+
+    headers = dict(headers or {})
+
+    if cached is not None and cached.etag:
+        headers["If-None-Match"] = cached.etag
+
+    response = get(url, headers=headers)
+
+    if response.status_code == 304 and cached is not None:
+        cached.fetched_at = time.time()
+        write_metadata(key, cached)
+
+        return cached.text
+
+    if not response.ok:
+        return None
+
+    record_bytes(len(response.content))
+
+    text = response.text if parse is None else parse(response.content)
+
+    if text is None:
+        return None
+
+    write_metadata(key, CachedMetadata(text, response.headers.get("ETag"), time.time()))
+
+    return text
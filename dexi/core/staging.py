@@ -0,0 +1,162 @@
+import shutil
+from pathlib import Path
+
+from .extract import FileRecord
+from .files import clone_file
+
+
+def staging_path(path: Path) -> Path:
+    """
+    Returns the folder a new version of an installed folder is extracted into.
+
+    Parameters
+    ----------
+    path: Path
+        The installed folder.
+    """
+    return path.with_name(f".{path.name}.dexi-staging")
+
+
+def previous_path(path: Path) -> Path:
+    """
+    Returns the folder the previous version of an installed folder is kept in.
+
+    Parameters
+    ----------
+    path: Path
+        The installed folder.
+    """
+    return path.with_name(f".{path.name}.dexi-previous")
+
+
+def _clone(source: str, destination: str):
+    clone_file(Path(source), Path(destination))
+    shutil.copystat(source, destination)
+
+
+def stage_directory(path: Path, reuse: bool = False) -> Path:
+    """
+    Creates an empty staging folder next to an installed folder and returns it.
+
+    Parameters
+    ----------
+    path: Path
+        The installed folder.
+    reuse: bool
+        Whether the staging folder starts as a copy of the installed folder. Files
+        are cloned, so on copy-on-write filesystems only changed files take up space.
+    """
+    staging = staging_path(path)
+
+    # Left behind by an install that was killed.
+    shutil.rmtree(staging, ignore_errors=True)
+
+    if reuse and path.is_dir():
+        shutil.copytree(path, staging, symlinks=True, copy_function=_clone)
+    else:
+        staging.mkdir(parents=True)
+
+    return staging
+
+
+def discard_staging(path: Path):
+    """
+    Deletes the staging folder of an installed folder, if any.
+
+    Parameters
+    ----------
+    path: Path
+        The installed folder.
+    """
+    shutil.rmtree(staging_path(path), ignore_errors=True)
+
+
+def swap_directory(path: Path):
+    """
+    Replaces an installed folder with its staging folder.
+
+    The installed folder is kept as the previous version. Both renames happen
+    back to back, so the folder is only missing for an instant.
+
+    Parameters
+    ----------
+    path: Path
+        The installed folder.
+    """
+    previous = previous_path(path)
+
+    shutil.rmtree(previous, ignore_errors=True)
+
+    if path.is_dir():
+        path.rename(previous)
+
+    staging_path(path).rename(path)
+
+
+def retire_directory(path: Path):
+    """
+    Moves an installed folder that is no longer used to its previous version slot.
+
+    Parameters
+    ----------
+    path: Path
+        The installed folder.
+    """
+    previous = previous_path(path)
+
+    shutil.rmtree(previous, ignore_errors=True)
+
+    if path.is_dir():
+        path.rename(previous)
+
+
+def rollback_directory(path: Path):
+    """
+    Exchanges an installed folder with its previous version.
+
+    Either folder may be missing, and rolling back twice restores the original.
+
+    Parameters
+    ----------
+    path: Path
+        The installed folder.
+    """
+    previous = previous_path(path)
+    temporary = staging_path(path)
+
+    shutil.rmtree(temporary, ignore_errors=True)
+
+    if path.is_dir():
+        path.rename(temporary)
+
+    if previous.is_dir():
+        previous.rename(path)
+
+    if temporary.is_dir():
+        temporary.rename(previous)
+
+
+def relocate_records(
+    records: dict[Path, FileRecord], folders: dict[Path, Path]
+) -> dict[Path, FileRecord]:
+    """
+    Returns file records with their paths moved from one folder to another.
+
+    Records outside every folder are dropped.
+
+    Parameters
+    ----------
+    records: dict[Path, FileRecord]
+        The file records, keyed by their absolute path.
+    folders: dict[Path, Path]
+        The new location of each folder.
+    """
+    relocated = {}
+
+    for file, record in records.items():
+        for source, destination in folders.items():
+            if file.is_relative_to(source):
+                relocated[destination / file.relative_to(source)] = record
+                break
+
+    return relocated
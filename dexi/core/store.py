@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import zipfile
+from pathlib import Path
+
+from .cache import cache_directory
+from .files import clone_file, temporary_path, write_if_possible
+
+COPY_BUFFER = 1024 * 1024
+
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+class StoreTree:
+    """
+    The content hash of every member of one archive, read from the file store.
+
+    Archives are identified by the name, size and CRC of their members, so an
+    archive seen before is materialized without decompressing anything.
+    """
+
+    def __init__(self, store: "FileStore", archive: zipfile.ZipFile):
+        digest = hashlib.sha256()
+
+        for info in archive.infolist():
+            digest.update(f"{info.filename}\0{info.file_size}\0{info.CRC}\n".encode())
+
+        self.store = store
+        self.archive = archive
+        self.path = store.path / "trees" / f"{digest.hexdigest()}.json"
+
+        self._lock = threading.Lock()
+        self._changed = False
+
+        try:
+            with self.path.open() as file:
+                self._objects: dict[str, str] = json.load(file)
+        except (OSError, ValueError):
+            self._objects = {}
+
+    def materialize(self, info: zipfile.ZipInfo, target_path: Path):
+        """
+        Places an archive member at a path, linked from the file store.
+
+        Parameters
+        ----------
+        info: zipfile.ZipInfo
+            The archive member.
+        target_path: Path
+            Where the member is placed. Must not exist.
+        """
+        with self._lock:
+            digest = self._objects.get(info.filename)
+
+        source = self.store.object_path(digest) if digest is not None else None
+
+        if source is None or not source.is_file():
+            try:
+                digest, source = self.store.add(self.archive, info)
+            except OSError:
+                # Files that can't be stored are extracted directly instead.
+                with self.archive.open(info) as src, target_path.open("wb") as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER)
+
+                return
+
+            with self._lock:
+                self._objects[info.filename] = digest
+                self._changed = True
+
+        self.store.link(source, target_path)
+
+    def save(self):
+        """
+        Writes the member hashes learned while materializing.
+        """
+        with self._lock:
+            if self._changed:
+                write_if_possible(self.path, json.dumps(self._objects))
+                self._changed = False
+
+
+class FileStore:
+    """
+    Files of every installed package, stored once per host by their SHA-256.
+
+    Installed files are copy-on-write clones of the stored files where the
+    filesystem supports it, and plain copies otherwise. With `hardlink` set, they
+    are hard links instead, which every install shares: stored files are read-only
+    on POSIX systems, but an edit that ignores this changes every install.
+    """
+
+    def __init__(self, path: Path, hardlink: bool = False):
+        self.path = path
+        self._can_link = hardlink
+
+    def object_path(self, digest: str) -> Path:
+        """
+        Returns the path of a stored file.
+
+        Parameters
+        ----------
+        digest: str
+            The SHA-256 of the file's contents.
+        """
+        return self.path / "objects" / digest[:2] / digest[2:]
+
+    def add(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> tuple[str, Path]:
+        """
+        Stores an archive member and returns its SHA-256 and stored path.
+
+        Parameters
+        ----------
+        archive: zipfile.ZipFile
+            The archive holding the member.
+        info: zipfile.ZipInfo
+            The archive member.
+        """
+        temporary = temporary_path(self.path / "objects" / "incoming")
+        temporary.parent.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+
+        try:
+            with archive.open(info) as src, temporary.open("wb") as dst:
+                while chunk := src.read(COPY_BUFFER):
+                    digest.update(chunk)
+                    dst.write(chunk)
+
+            # Windows can't delete read-only files, so they stay writable there.
+            if os.name == "posix":
+                temporary.chmod(READ_ONLY)
+
+            path = self.object_path(digest.hexdigest())
+            path.parent.mkdir(exist_ok=True)
+
+            # Keeps the file another thread may have stored first, and linked since.
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+            except OSError:
+                temporary.replace(path)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+
+        temporary.unlink(missing_ok=True)
+
+        return digest.hexdigest(), path
+
+    def link(self, source: Path, target_path: Path):
+        """
+        Clones a stored file to a path, or hard links it if the store uses hard links.
+
+        Parameters
+        ----------
+        source: Path
+            The stored file.
+        target_path: Path
+            Where the file is placed. Must not exist.
+        """
+        if self._can_link:
+            try:
+                os.link(source, target_path)
+                return
+            except OSError:
+                # Usually a different filesystem, which won't change mid-install.
+                self._can_link = False
+
+        clone_file(source, target_path)
+
+    def tree(self, archive: zipfile.ZipFile) -> StoreTree:
+        """
+        Returns the stored member hashes of an archive.
+
+        Parameters
+        ----------
+        archive: zipfile.ZipFile
+            The archive.
+        """
+        return StoreTree(self, archive)
+
+
+def file_store() -> FileStore | None:
+    """
+    Returns the shared file store, or `None` if it is disabled.
+
+    Stored in `<cache directory>/store`. `DEXI_LINK_MODE` sets how installed files
+    are placed: `reflink` clones stored files, `hardlink` hard links them, and
+    `copy` disables the store, extracting every file from its archive.
+    """
+    mode = os.environ.get("DEXI_LINK_MODE", "reflink")
+
+    if mode == "copy":
+        return None
+
+    return FileStore(cache_directory() / "store", hardlink=mode == "hardlink")
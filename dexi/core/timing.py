@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+_enabled = False
+_started = 0.0
+
+_spans: "list[Span]" = []
+_spans_lock = threading.Lock()
+
+_local = threading.local()
+
+
+@dataclass(slots=True)
+class Span:
+    """
+    A timed phase of a command.
+
+    Requests and bytes are counted on the innermost span of the thread that made
+    them, so they are never counted twice.
+    """
+
+    name: str
+    package: str | None
+    thread: int
+    start: float
+    end: float = 0.0
+    requests: int = 0
+    bytes: int = 0
+    details: dict[str, str | int] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def enable_timings():
+    """
+    Starts recording spans. Recording is disabled by default and costs nothing.
+    """
+    global _enabled, _started
+
+    _enabled = True
+    _started = time.perf_counter()
+
+
+def timings_enabled() -> bool:
+    """
+    Returns whether spans are being recorded.
+    """
+    return _enabled
+
+
+@contextmanager
+def span(name: str, package: str | None = None) -> Iterator[Span | None]:
+    """
+    Times the code run inside it.
+
+    Spans opened inside another span on the same thread inherit its package.
+
+    Parameters
+    ----------
+    name: str
+        The name of the phase, such as `download` or `extract`.
+    package: str | None
+        The package being processed.
+    """
+    if not _enabled:
+        yield None
+        return
+
+    stack: list[Span] = _local.__dict__.setdefault("stack", [])
+
+    if package is None and stack:
+        package = stack[-1].package
+
+    current = Span(name, package, threading.get_ident(), time.perf_counter())
+    stack.append(current)
+
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        stack.pop()
+
+        with _spans_lock:
+            _spans.append(current)
+
+
+def record_request(size: int = 0):
+    """
+    Counts a request and the bytes it transferred on the current span.
+
+    Parameters
+    ----------
+    size: int
+        The amount of bytes received.
+    """
+    if not _enabled:
+        return
+
+    stack = _local.__dict__.get("stack")
+
+    if stack:
+        stack[-1].requests += 1
+        stack[-1].bytes += size
+
+
+def record_bytes(size: int):
+    """
+    Counts bytes received by a request already counted on the current span.
+
+    Parameters
+    ----------
+    size: int
+        The amount of bytes received.
+    """
+    if not _enabled:
+        return
+
+    stack = _local.__dict__.get("stack")
+
+    if stack:
+        stack[-1].bytes += size
+
+
+def print_timings(console: "Console"):
+    """
+    Prints the time spent in each phase, summed over every package.
+
+    Parameters
+    ----------
+    console: Console
+        The console the table is printed to.
+    """
+    from rich.table import Table
+
+    totals: dict[str, list[float]] = {}
+
+    with _spans_lock:
+        spans = list(_spans)
+
+    for item in spans:
+        total = totals.setdefault(item.name, [0, 0.0, 0.0, 0, 0])
+        total[0] += 1
+        total[1] += item.duration
+        total[2] = max(total[2], item.duration)
+        total[3] += item.requests
+        total[4] += item.bytes
+
+    table = Table(title=f"Timings ({time.perf_counter() - _started:.2f}s total)")
+
+    for column in ("Phase", "Count", "Total", "Max", "Requests", "Bytes"):
+        table.add_column(column, justify="left" if column == "Phase" else "right")
+
+    for name, (count, duration, longest, requests, size) in sorted(
+        totals.items(), key=lambda item: item[1][1], reverse=True
+    ):
+        table.add_row(
+            name,
+            str(int(count)),
+            f"{duration * 1000:.1f} ms",
+            f"{longest * 1000:.1f} ms",
+            str(int(requests)),
+            str(int(size)),
+        )
+
+    console.print(table)
+
+
+def write_trace(path: Path):
+    """
+    Writes every span to a Chrome trace file, viewable in Perfetto or
+    `chrome://tracing`.
+
+    Parameters
+    ----------
+    path: Path
+        The file the trace is written to.
+    """
+    with _spans_lock:
+        spans = list(_spans)
+
+    threads = {thread: i for i, thread in enumerate(sorted({s.thread for s in spans}))}
+
+    events = [
+        {
+            "name": item.name,
+            "cat": item.package or "dexi",
+            "ph": "X",
+            "ts": round((item.start - _started) * 1_000_000),
+            "dur": round(item.duration * 1_000_000),
+            "pid": os.getpid(),
+            "tid": threads[item.thread],
+            "args": {
+                "package": item.package,
+                "requests": item.requests,
+                "bytes": item.bytes,
+                **item.details,
+            },
+        }
+        for item in sorted(spans, key=lambda item: item.start)
+    ]
+
+    path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
@@ -1,24 +1,59 @@
 import re
 import sys
+import threading
 from pathlib import Path
-from typing import cast
+from typing import Any, Callable, TypeVar
 
-import requests
-from packaging.version import parse as parse_version
 from rich.console import Console
-from tomlkit import TOMLDocument, parse
+from tomlkit import TOMLDocument, dumps, parse
 
-from .dexi_types import PackageEntry
+from .config import active_transaction, config_transaction
+from .files import write_atomically
+from .network import NetworkError, is_offline
+from .packages import AmbiguousPackageError, PackageList, PackageRecord
+from .project import active_project
+from .sources import get_source
+from .timing import span
 
 MODEL_RE = re.compile(r'("models"\s*:\s*\[)([^]]*)(\])')
 SUPPORTED_APP_VERSION = "2.29.5"
 
+T = TypeVar("T")
+
 console = Console()
 
+_memo: dict[str, Any] = {}
+_memo_locks: dict[str, threading.Lock] = {}
+_memo_lock = threading.Lock()
+
+
+def _memoized(key: str, loader: Callable[[], T]) -> T:
+    """
+    Returns the value loaded for a key, loading it at most once per command.
+    """
+    with _memo_lock:
+        lock = _memo_locks.setdefault(key, threading.Lock())
+
+    with lock:
+        if key not in _memo:
+            _memo[key] = loader()
+
+        return _memo[key]
+
+
+class PyprojectError(Exception):
+    """
+    Raised when a package's pyproject file can't be fetched or has no project.
+    """
+
 
 def fetch_pyproject(package: str, branch: str) -> dict:
     """
-    Returns the parsed contents of a pyproject file from GitHub.
+    Returns the parsed contents of a pyproject file from the package source.
+
+    Each package is fetched at most once per command. Responses from remote sources
+    are stored in the on-disk metadata cache and revalidated with their ETag once
+    they go stale.
 
     Parmaters
     ---------
@@ -27,22 +62,58 @@ def fetch_pyproject(package: str, branch: str) -> dict:
     branch: str
         The package's branch.
     """
-    author, repository = package.split("/")
-    name = package_name(package, branch)
+    try:
+        return load_pyproject(package, branch)
+    except PyprojectError as exception:
+        error(str(exception))
+        raise
+
+
+def load_pyproject(package: str, branch: str) -> dict:
+    """
+    Returns the parsed contents of a pyproject file, like `fetch_pyproject`, but
+    raises `PyprojectError` instead of stopping the command when it can't be read.
 
-    url = (
-        f"https://raw.githubusercontent.com/{author}/{repository}/{branch}/pyproject.toml"
+    Parameters
+    ----------
+    package: str
+        The package you want to return from.
+    branch: str
+        The package's branch.
+    """
+    return _memoized(
+        f"pyproject:{package_name(package, branch)}",
+        lambda: _load_pyproject(package, branch),
     )
 
-    response = requests.get(url)
 
-    if not response.ok:
-        error(f"Failed to fetch [red]pyproject.toml[/red] from [red]{name}[/red]")
+def _load_pyproject(package: str, branch: str) -> dict:
+    name = package_name(package, branch)
+    source = get_source()
+
+    with span("fetch_pyproject", name):
+        try:
+            text = source.pyproject(package, branch)
+        except NetworkError as exception:
+            raise PyprojectError(
+                "Failed to fetch [red]pyproject.toml[/red] from "
+                f"[red]{name}[/red]: {exception}"
+            ) from exception
+
+    if text is None:
+        if is_offline() and source.remote:
+            raise PyprojectError(
+                f"[red]{name}[/red] is not cached and cannot be fetched offline"
+            )
+
+        raise PyprojectError(
+            f"Failed to fetch [red]pyproject.toml[/red] from [red]{name}[/red]"
+        )
 
-    data = parse(response.text)
+    data = parse(text).unwrap()
 
     if "project" not in data:
-        error(
+        raise PyprojectError(
             'Failed to find [red]"project"[/red] section in '
             f"[red]pyproject.toml[/red] from [red]{name}[/red]"
         )
@@ -50,15 +121,41 @@ def fetch_pyproject(package: str, branch: str) -> dict:
     return data
 
 
+def fetch_commit(package: str, branch: str) -> str | None:
+    """
+    Returns the commit SHA a package's branch points to.
+
+    Returns `None` if the commit could not be resolved, such as when offline.
+
+    Parameters
+    ----------
+    package: str
+        The package you want to resolve.
+    branch: str
+        The package's branch.
+    """
+    name = package_name(package, branch)
+
+    def load() -> str | None:
+        with span("fetch_commit", name):
+            return get_source().commit(package, branch)
+
+    return _memoized(f"commit:{name}", load)
+
+
 def parse_pyproject(path: Path | None = None) -> TOMLDocument:
     """
     Parses a pyproject file and returns it.
 
+    Inside a project transaction, the file is only parsed once and shared.
+
     Parameters
     ----------
     path: str | None
         The path that holds the pyproject file.
     """
+    transaction = active_project(path)
+
     if path is None:
         path = Path.cwd()
 
@@ -67,15 +164,60 @@ def parse_pyproject(path: Path | None = None) -> TOMLDocument:
     if not path.is_file():
         error("Failed to find [red]pyproject.toml[/red] in the current directory")
 
+    if transaction is not None:
+        return transaction.document
+
     with path.open() as file:
         return parse(file.read())
 
 
-def app_operations_supported() -> bool:
+def save_pyproject(project: TOMLDocument, path: Path | None = None):
     """
-    Returns whether app operations are supported on this Ballsdex version.
+    Saves a pyproject file returned by `parse_pyproject`.
+
+    Inside a project transaction, the write is deferred to the end of the command.
+
+    Parameters
+    ----------
+    project: TOMLDocument
+        The pyproject file that will be saved.
+    path: str | None
+        The path that holds the pyproject file.
     """
-    return parse_version(fetch_ballsdex_version()) >= parse_version(SUPPORTED_APP_VERSION)
+    transaction = active_project(path)
+
+    if transaction is not None and transaction.document is project:
+        transaction.mark_dirty()
+        return
+
+    if path is None:
+        path = Path.cwd()
+
+    write_pyproject(dumps(project), path)
+
+
+def write_pyproject(text: str, path: Path | None = None):
+    """
+    Immediately writes the rendered contents of a pyproject file.
+
+    Parameters
+    ----------
+    text: str
+        The pyproject file's new contents.
+    path: str | None
+        The path that holds the pyproject file.
+    """
+    transaction = active_project(path)
+
+    if transaction is not None:
+        transaction.write(text)
+        return
+
+    if path is None:
+        path = Path.cwd()
+
+    with span("pyproject_write"):
+        write_atomically(path / "pyproject.toml", text)
 
 
 def fetch_ballsdex_version(path: Path | None = None) -> str:
@@ -113,47 +255,34 @@ def package_name(package: str, branch: str) -> str:
     return f"{package}@{branch}"
 
 
-def fetch_package(package: str, packages: list[PackageEntry]) -> PackageEntry | None:
+def fetch_package(package: str, packages: PackageList) -> PackageRecord | None:
     """
-    Returns a package from a list of packages.
+    Returns a package by its `author/repository` identifier or repository name.
 
     Parameters
     ----------
     package: str
         The package you're searching for.
-    packages: list[PackageEntry]
-        A list of packages.
-    """
-    for item in packages:
-        if "/" in package and item["git"] != package:
-            continue
-
-        if "/" not in package and item["git"].split("/")[1] != package:
-            continue
-
-        return cast(PackageEntry, item)
-
-    return None
-
-
-def fetch_all_packages() -> list[PackageEntry]:
-    """
-    Returns a list of all packages in the pyproject file.
+    packages: PackageList
+        The packages listed in the pyproject file.
     """
-    project = parse_pyproject()
-
-    if "tool" not in project or "dexi" not in project["tool"]:  # type: ignore
-        return []
-
-    packages = project["tool"]["dexi"].get("packages", [])  # type: ignore
-
-    return cast(list[PackageEntry], packages)
+    try:
+        return packages.find(package)
+    except AmbiguousPackageError as exception:
+        error(
+            f"[red]'{package}'[/red] matches several packages "
+            f"([red]{', '.join(exception.matches)}[/red]), use its full "
+            "[red]author/repository[/red] name"
+        )
+        return None
 
 
 def add_list_entry(section: str, entry: str, path: Path | None = None):
     """
     Adds an item to a list in the config file.
 
+    The edit is batched into the open config transaction, if there is one.
+
     Parameters
     ----------
     section: str
@@ -161,34 +290,25 @@ def add_list_entry(section: str, entry: str, path: Path | None = None):
     entry: str
         The item that will be appended to the config list.
     path: str | None
-        The config file path.
+        The project root that holds the config file.
     """
-    if path is None:
-        path = Path.cwd()
-
-    path = path / "config.yml"
-
-    with path.open() as file:
-        lines = file.readlines()
-
-    item = f"  - {entry}\n"
+    with span("config_edit"):
+        transaction = active_transaction(path)
 
-    if f"{section}:\n" not in lines or item in lines:
-        return
+        if transaction is not None:
+            transaction.add(section, entry)
+            return
 
-    for i, line in enumerate(lines):
-        if line.rstrip().startswith(f"{section}:"):
-            lines.insert(i + 1, item)
-            break
-
-    with path.open("w") as file:
-        file.writelines(lines)
+        with config_transaction(path) as transaction:
+            transaction.add(section, entry)
 
 
 def remove_list_entry(section: str, entry: str, path: Path | None = None):
     """
     Removes an item from a list in the config file.
 
+    The edit is batched into the open config transaction, if there is one.
+
     Parameters
     ----------
     section: str
@@ -196,25 +316,17 @@ def remove_list_entry(section: str, entry: str, path: Path | None = None):
     entry: str
         The item that will be removed from the config list.
     path: str | None
-        The config file path.
+        The project root that holds the config file.
     """
-    if path is None:
-        path = Path.cwd()
-
-    path = path / "config.yml"
-
-    with path.open() as file:
-        lines = file.readlines()
-
-    item = f"  - {entry}\n"
-
-    if f"{section}:\n" not in lines or item not in lines:
-        return
+    with span("config_edit"):
+        transaction = active_transaction(path)
 
-    lines.remove(item)
+        if transaction is not None:
+            transaction.remove(section, entry)
+            return
 
-    with path.open("w") as file:
-        file.writelines(lines)
+        with config_transaction(path) as transaction:
+            transaction.remove(section, entry)
 
 
 def error(message: str) -> None:
@@ -227,7 +339,13 @@ def error(message: str) -> None:
         The message you want to output
     """
     if "$BD_V" in message:
-        message = message.replace("$BD_V", fetch_ballsdex_version())
+        # The context module imports this one.
+        from .context import active_context
+
+        context = active_context()
+        version = context.ballsdex_version if context else fetch_ballsdex_version()
+
+        message = message.replace("$BD_V", version)
 
     console.print(f"[bold red]ERROR[/bold red] — [white]{message}[/white]")
     sys.exit(1)